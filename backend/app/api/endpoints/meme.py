@@ -249,7 +249,6 @@ async def get_meme_preferences(
             )
             db.add(preference)
             await db.commit()
-            await db.refresh(preference)
         
         return {
             "user_id": str(preference.user_id),
@@ -304,7 +303,6 @@ async def update_meme_preferences(
             preference.meme_enabled = meme_enabled
         
         await db.commit()
-        await db.refresh(preference)
         
         logger.info(
             f"Updated meme preferences for user {current_user['user_id']}: "
@@ -231,8 +231,8 @@ async def update_proactive_preferences(
     if max_messages_per_day is not None:
         preference.max_daily_messages = max_messages_per_day
     
+    # 所有列均为客户端默认值，get_db 会话 expire_on_commit=False，提交后属性仍有效，无需 refresh
     await db.commit()
-    await db.refresh(preference)
     
     return {
         "success": True,
@@ -1,5 +1,7 @@
 """数据库连接管理"""
 import asyncio
+import json
+from functools import partial
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import text
@@ -31,7 +33,14 @@ engine = create_async_engine(
     settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
     echo=settings.DEBUG,
     pool_size=10,
-    max_overflow=20
+    max_overflow=20,
+    pool_pre_ping=True,
+    # JSON 列序列化：中文不转义为 \uXXXX、紧凑分隔符，写入更快、体积更小
+    json_serializer=partial(json.dumps, ensure_ascii=False, separators=(",", ":")),
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
 )
 
 # 异步会话工厂
@@ -73,3 +73,6 @@ class UserProactivePreference(Base):
     preferred_greeting_time = Column(Time, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    # 关系
+    user = relationship("User", back_populates="proactive_preference")
@@ -24,3 +24,4 @@ class User(Base):
     affinity_history = relationship("AffinityHistory", back_populates="user", cascade="all, delete-orphan")
     context_memories = relationship("ContextMemory", back_populates="user", cascade="all, delete-orphan")
     profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    proactive_preference = relationship("UserProactivePreference", back_populates="user", uselist=False, cascade="all, delete-orphan")
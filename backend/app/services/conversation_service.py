@@ -1,4 +1,5 @@
 """对话服务 - 协调整个对话流程"""
+import re
 import uuid
 import logging
 import time
@@ -57,6 +58,10 @@ class ConversationMode:
     HYBRID = "hybrid"          # 图谱 + 短期记忆，用于 Chat 体验
 
 
+# 允许注入短期记忆（对话历史）的模式；其余模式一律物理隔离
+HISTORY_MODES = frozenset({ConversationMode.HYBRID})
+
+
 class EmotionAnalyzer:
     """情感分析器"""
     
@@ -135,6 +140,7 @@ class TierRouter:
         "你好", "早上好", "晚上好", "晚安", "谢谢", "好的", "嗯",
         "hi", "hello", "hey", "拜拜", "再见", "ok"
     ]
+    SIMPLE_PATTERN_RE = re.compile("|".join(map(re.escape, SIMPLE_PATTERNS)))
     
     # 低亲密度状态（优先使用 Tier 3）
     LOW_AFFINITY_STATES = ["stranger", "acquaintance"]
@@ -213,11 +219,7 @@ class TierRouter:
         message_lower = message.strip().lower()
         
         # 检查是否匹配简单模式
-        for pattern in self.SIMPLE_PATTERNS:
-            if pattern in message_lower:
-                return True
-        
-        return False
+        return self.SIMPLE_PATTERN_RE.search(message_lower) is not None
     
     def get_routing_explanation(
         self,
@@ -872,6 +874,11 @@ class ConversationService:
         - 长期记忆（Graph）：用于事实性问题，是推理的基础
         - 短期记忆（History）：仅用于上下文理解，不作为事实来源
         """
+        # 防御式校验：非 Hybrid 模式不得带入对话历史
+        allows_history = mode in HISTORY_MODES
+        if conversation_history and not allows_history:
+            raise ValueError(f"mode={mode} 不允许注入对话历史（短期记忆物理隔离）")
+        
         tone_config = AffinityService.get_tone_config(affinity.state)
         
         # ========== 长期记忆：图谱事实（多跳推理的基础）==========
@@ -914,7 +921,7 @@ class ConversationService:
         
         # ========== 短期记忆：对话历史（仅 Hybrid 模式）==========
         history_context = ""
-        if mode == ConversationMode.HYBRID and conversation_history:
+        if allows_history and conversation_history:
             history_lines = []
             for turn in conversation_history[-5:]:  # 最近 5 轮
                 role = "用户" if turn.get("role") == "user" else "AI"
@@ -951,7 +958,7 @@ class ConversationService:
 """
         
         # 仅 Hybrid 模式添加短期记忆
-        if mode == ConversationMode.HYBRID and history_context:
+        if history_context:
             prompt += f"""
 === 短期记忆（本次对话历史）===
 【注意：仅供理解上下文，不作为事实来源】
@@ -11,9 +11,9 @@ from app.core.database import get_redis_client
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class EntityMention:
-    """实体提及"""
+    """实体提及 (不可变，slots 减少实例内存与属性访问开销)"""
     id: str
     name: str
     entity_type: str  # person, place, thing, event
@@ -1,8 +1,14 @@
 """Pytest 配置和 Fixtures"""
+import os
+import json
+from contextlib import contextmanager
+from functools import partial
 import pytest
 import asyncio
 from typing import AsyncGenerator, Generator
 from httpx import AsyncClient
+from hypothesis import settings as hypothesis_settings, Phase
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.main import app
@@ -14,6 +20,40 @@ from app.core.database import Base, get_db
 TEST_DATABASE_URL = settings.DATABASE_URL.replace("affinity", "affinity_test")
 
 
+# Hypothesis 配置：CI 下固定随机种子，保证属性测试可复现
+hypothesis_settings.register_profile(
+    "ci",
+    derandomize=True,
+    phases=(Phase.explicit, Phase.reuse, Phase.generate),
+)
+hypothesis_settings.register_profile("dev")
+hypothesis_settings.load_profile(
+    os.getenv("HYPOTHESIS_PROFILE", "ci" if os.getenv("CI") else "dev")
+)
+
+
+@contextmanager
+def _count_queries(conn):
+    """统计代码块内经由该连接（AsyncConnection/AsyncEngine）发出的 SQL 语句"""
+    target = getattr(conn, "sync_connection", None) or getattr(conn, "sync_engine", conn)
+    queries = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+    
+    event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def count_queries():
+    """提供 SQL 语句计数上下文管理器：with count_queries(conn) as queries: ..."""
+    return _count_queries
+
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
     """创建事件循环"""
@@ -41,6 +81,49 @@ async def test_engine():
     await engine.dispose()
 
 
+@pytest.fixture(scope="session")
+async def async_engine():
+    """整个测试会话共享的业务库引擎（连接握手与 asyncpg 类型探测只做一次）"""
+    engine = create_async_engine(
+        settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        pool_use_lifo=True,  # 优先复用最近使用的连接，多余连接自然老化
+        pool_pre_ping=True,
+        json_serializer=partial(json.dumps, ensure_ascii=False, separators=(",", ":")),
+        echo=bool(os.getenv("SQL_ECHO"))
+    )
+    
+    # 预热连接池：并发建立 pool_size 个连接（握手与类型探测移出测试体）
+    async def warm_connection():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    await asyncio.gather(*(warm_connection() for _ in range(engine.pool.size())))
+    
+    yield engine
+    
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def async_session_factory(async_engine):
+    """基于共享引擎的会话工厂"""
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@pytest.fixture(scope="session")
+def milvus_collection():
+    """整个测试会话共享已加载的 Milvus 集合（load() 冷启动耗时较长，只做一次）"""
+    from pymilvus import connections, Collection
+    
+    connections.connect("default", host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+    collection = Collection(settings.MILVUS_COLLECTION)
+    collection.load()
+    
+    yield collection
+    
+    connections.disconnect("default")
+
+
 @pytest.fixture
 async def db_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     """创建测试数据库会话"""
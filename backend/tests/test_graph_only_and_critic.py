@@ -286,6 +286,37 @@ def test_ir_critic_strict_mode():
     print("\n✅ 严格模式测试通过")
 
 
+def test_prompt_history_isolation():
+    """测试 Prompt 构建的短期记忆隔离：逐个模式校验，保证 HISTORY_MODES 覆盖完整"""
+    from types import SimpleNamespace
+    from app.services.conversation_service import (
+        ConversationService, ConversationMode, HISTORY_MODES
+    )
+    
+    service = ConversationService.__new__(ConversationService)  # 仅构建 Prompt，无需外部依赖
+    affinity = SimpleNamespace(state="friend", new_score=0.5)
+    emotion = {"primary_emotion": "neutral", "valence": 0.0}
+    history = [{"role": "user", "content": "我们刚才聊到大连"}]
+    
+    for mode in (ConversationMode.GRAPH_ONLY, ConversationMode.HYBRID):
+        # 不带历史时任何模式都能构建
+        prompt = service._build_prompt("谁去了", [], affinity, emotion, [], None, mode)
+        assert "本次对话历史" not in prompt
+        
+        if mode in HISTORY_MODES:
+            prompt = service._build_prompt("谁去了", [], affinity, emotion, [], history, mode)
+            assert "本次对话历史" in prompt
+        else:
+            try:
+                service._build_prompt("谁去了", [], affinity, emotion, [], history, mode)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"{mode} 模式不应接受对话历史")
+    
+    print("✅ Prompt 短期记忆隔离验证通过")
+
+
 async def main():
     """运行所有测试"""
     print("\n" + "="*60)
@@ -295,6 +326,7 @@ async def main():
     # 测试 IR Critic（不需要数据库连接）
     test_ir_critic()
     test_ir_critic_strict_mode()
+    test_prompt_history_isolation()
     
     # 测试 Graph-only 模式（需要数据库连接）
     try:
@@ -16,6 +16,8 @@ from app.services.meme_usage_history_service import MemeUsageHistoryService
 from app.services.content_pool_manager_service import ContentPoolManagerService
 from app.models.user import User
 from app.models.session import Session
+from app.models.meme import Meme
+from app.models.meme_usage_history import MemeUsageHistory
 
 
 async def test_meme_usage_history_service():
@@ -47,10 +49,6 @@ async def test_meme_usage_history_service():
                     hashed_password="test_hash"
                 )
                 db.add(user)
-                await db.commit()
-                await db.refresh(user)
-            
-            print(f"   ✓ 用户: {user.id}")
             
             # 创建测试会话
             session = Session(
@@ -58,8 +56,11 @@ async def test_meme_usage_history_service():
                 user_id=user.id
             )
             db.add(session)
-            await db.commit()
-            await db.refresh(session)
+            
+            # 主键由客户端生成，无需 refresh 回查；这里只 flush，
+            # 与下面 create_meme_candidate 内部的 commit 合并为同一个事务
+            await db.flush()
+            print(f"   ✓ 用户: {user.id}")
             print(f"   ✓ 会话: {session.id}")
             
             # 创建测试表情包
@@ -104,21 +105,26 @@ async def test_meme_usage_history_service():
             # 5. 测试计算接受率
             print("\n5. 测试计算接受率...")
             
-            # 创建更多测试数据
-            for i in range(3):
-                meme2 = await pool_service.create_meme_candidate(
+            # 创建更多测试数据 (单个 commit 批量写入；上面已逐个覆盖服务 API)
+            seed_rows = []
+            for i, reaction in enumerate(["liked", "ignored", "disliked"]):
+                meme2 = Meme(
+                    id=uuid4(),
                     text_description=f"测试表情包 {i}",
                     source_platform="weibo",
                     content_hash=f"test_hash_{uuid4().hex}"
                 )
-                usage2 = await usage_service.record_usage(
+                seed_rows.append(meme2)
+                # 不同的反应
+                seed_rows.append(MemeUsageHistory(
                     user_id=user.id,
                     meme_id=meme2.id,
-                    conversation_id=session.id
-                )
-                # 不同的反应
-                reactions = ["liked", "ignored", "disliked"]
-                await usage_service.record_feedback(usage2.id, reactions[i])
+                    conversation_id=session.id,
+                    used_at=datetime.utcnow(),
+                    user_reaction=reaction
+                ))
+            db.add_all(seed_rows)
+            await db.commit()
             
             acceptance_rate = await usage_service.calculate_acceptance_rate()
             print(f"   ✓ 接受率: {acceptance_rate:.2%}")
@@ -1,35 +1,65 @@
 """测试 Neo4j 连接"""
 import asyncio
+import pytest
 from neo4j import AsyncGraphDatabase
 
-async def test_neo4j():
-    try:
-        # 直接使用配置中的连接信息
-        driver = AsyncGraphDatabase.driver(
-            "bolt://localhost:7687",
-            auth=("neo4j", "neo4j_secret")
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_AUTH = ("neo4j", "neo4j_secret")
+
+# 模块级共享驱动（Bolt 握手只做一次，由连接池复用）
+_driver = None
+
+
+def get_driver():
+    global _driver
+    if _driver is None:
+        _driver = AsyncGraphDatabase.driver(
+            NEO4J_URI,
+            auth=NEO4J_AUTH,
+            max_connection_pool_size=50,
+            connection_acquisition_timeout=30
         )
-        
+    return _driver
+
+
+async def close_driver():
+    global _driver
+    if _driver is not None:
+        await _driver.close()
+        _driver = None
+
+
+@pytest.fixture(scope="session")
+async def neo4j_driver():
+    """整个测试会话共享一个 Neo4j 驱动，结束时关闭"""
+    yield get_driver()
+    await close_driver()
+
+
+async def test_neo4j(neo4j_driver):
+    try:
         # 测试连接
-        await driver.verify_connectivity()
+        await neo4j_driver.verify_connectivity()
         print("Neo4j 连接成功")
-        
-        # 测试查询
-        session = driver.session()
-        result = await session.run("RETURN 1 as test")
-        record = await result.single()
-        print(f"Neo4j 查询成功: {record['test']}")
-        
+
+        # 测试查询（execute_query 自动管理会话、路由和重试）
+        records, _, _ = await neo4j_driver.execute_query("RETURN 1 as test")
+        print(f"Neo4j 查询成功: {records[0]['test']}")
+
         # 检查是否有数据
-        result = await session.run("MATCH (n) RETURN count(n) as count")
-        record = await result.single()
-        print(f"Neo4j 节点数量: {record['count']}")
-        
-        await session.close()
-        await driver.close()
-        
+        records, _, _ = await neo4j_driver.execute_query("MATCH (n) RETURN count(n) as count")
+        print(f"Neo4j 节点数量: {records[0]['count']}")
+
     except Exception as e:
         print(f"Neo4j 连接失败: {e}")
 
+
+async def main():
+    try:
+        await test_neo4j(get_driver())
+    finally:
+        await close_driver()
+
+
 if __name__ == "__main__":
-    asyncio.run(test_neo4j())
\ No newline at end of file
+    asyncio.run(main())
@@ -21,6 +21,29 @@ TEST_SESSION_ID = str(uuid.uuid4())
 # 测试用户 Token（需要先注册）
 TEST_TOKEN = None
 
+# 共享 HTTP 客户端（复用 keep-alive 连接，避免每次请求重新握手）
+_client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """获取模块级共享的 AsyncClient（首次调用时创建）"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+        )
+    return _client
+
+
+async def close_client():
+    """关闭共享 HTTP 客户端"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 async def register_test_user():
     """注册测试用户（简化版 - 使用默认测试用户）"""
@@ -29,107 +52,111 @@ async def register_test_user():
     # 使用默认测试用户
     TEST_USER_ID = "test_user_001"
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            # 尝试登录
-            response = await client.post(
-                f"{API_BASE_URL}/auth/login",
+    client = get_client()
+    try:
+        # 登录与注册并发发起（注册幂等：已存在时返回冲突，忽略即可），优先采用登录结果
+        login_resp, register_resp = await asyncio.gather(
+            client.post(
+                "/auth/login",
                 json={
                     "username": "test_user_001",
                     "password": "test123456"
                 }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                TEST_TOKEN = data.get("access_token")
-                print(f"✅ 测试用户登录成功: {TEST_USER_ID}")
-                return True
-            
-            # 如果登录失败，尝试注册
-            response = await client.post(
-                f"{API_BASE_URL}/auth/register",
+            ),
+            client.post(
+                "/auth/register",
                 json={
                     "username": "test_user_001",
                     "password": "test123456",
                     "email": "test_user_001@test.com"
                 }
-            )
-            
-            if response.status_code == 200 or response.status_code == 201:
-                data = response.json()
-                TEST_TOKEN = data.get("access_token")
-                print(f"✅ 测试用户注册成功: {TEST_USER_ID}")
+            ),
+            return_exceptions=True
+        )
+        
+        for label, response in (("登录", login_resp), ("注册", register_resp)):
+            if isinstance(response, Exception):
+                continue
+            if response.status_code in (200, 201):
+                TEST_TOKEN = response.json().get("access_token")
+                print(f"✅ 测试用户{label}成功: {TEST_USER_ID}")
                 return True
-            
-            print(f"⚠️  认证失败，尝试无认证模式")
-            # 某些端点可能不需要认证，继续测试
-            return True
-            
-        except Exception as e:
-            print(f"⚠️  认证异常: {e}，尝试无认证模式")
-            return True
+        
+        print(f"⚠️  认证失败，尝试无认证模式")
+        # 某些端点可能不需要认证，继续测试
+        return True
+        
+    except Exception as e:
+        print(f"⚠️  认证异常: {e}，尝试无认证模式")
+        return True
 
 
 async def send_message(message: str, show_details: bool = True):
     """发送消息并获取回复"""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            start_time = datetime.now()
-            
-            headers = {}
-            if TEST_TOKEN:
-                headers["Authorization"] = f"Bearer {TEST_TOKEN}"
+    client = get_client()
+    try:
+        start_time = datetime.now()
+        
+        headers = {}
+        if TEST_TOKEN:
+            headers["Authorization"] = f"Bearer {TEST_TOKEN}"
+        
+        response = await client.post(
+            "/conversation/message",
+            headers=headers,
+            json={
+                "message": message,
+                "session_id": TEST_SESSION_ID,
+                "user_id": TEST_USER_ID  # 直接传递 user_id
+            }
+        )
+        
+        end_time = datetime.now()
+        response_time = (end_time - start_time).total_seconds() * 1000
+        
+        if response.status_code == 200:
+            data = response.json()
+            reply = data.get("reply", "")
+            context_source = data.get("context_source", {})
             
-            response = await client.post(
-                f"{API_BASE_URL}/conversation/message",
-                headers=headers,
-                json={
-                    "message": message,
-                    "session_id": TEST_SESSION_ID,
-                    "user_id": TEST_USER_ID  # 直接传递 user_id
-                }
-            )
+            if show_details:
+                print(f"\n{'─' * 80}")
+                print(f"👤 用户: {message}")
+                print(f"{'─' * 80}")
+                print(f"🤖 AI: {reply}")
+                print(f"{'─' * 80}")
+                print(f"📊 元数据:")
+                print(f"   - 响应时间: {response_time:.0f}ms")
+                print(f"   - 模式: {context_source.get('mode', 'unknown')}")
+                print(f"   - 缓存: {'是' if context_source.get('cached') else '否'}")
+                print(f"   - 图谱事实: {context_source.get('graph_facts_count', 0)} 条")
+                print(f"   - 向量记忆: {context_source.get('vector_memories_count', 0)} 条")
+                print(f"   - 对话历史: {context_source.get('history_turns_count', 0)} 轮")
+                print(f"{'─' * 80}")
             
-            end_time = datetime.now()
-            response_time = (end_time - start_time).total_seconds() * 1000
+            return {
+                "reply": reply,
+                "response_time": response_time,
+                "context_source": context_source,
+                "success": True
+            }
+        else:
+            print(f"❌ 请求失败: {response.status_code}")
+            print(f"   错误: {response.text[:200]}")
+            return {"success": False, "error": response.text}
             
-            if response.status_code == 200:
-                data = response.json()
-                reply = data.get("reply", "")
-                context_source = data.get("context_source", {})
-                
-                if show_details:
-                    print(f"\n{'─' * 80}")
-                    print(f"👤 用户: {message}")
-                    print(f"{'─' * 80}")
-                    print(f"🤖 AI: {reply}")
-                    print(f"{'─' * 80}")
-                    print(f"📊 元数据:")
-                    print(f"   - 响应时间: {response_time:.0f}ms")
-                    print(f"   - 模式: {context_source.get('mode', 'unknown')}")
-                    print(f"   - 缓存: {'是' if context_source.get('cached') else '否'}")
-                    print(f"   - 图谱事实: {context_source.get('graph_facts_count', 0)} 条")
-                    print(f"   - 向量记忆: {context_source.get('vector_memories_count', 0)} 条")
-                    print(f"   - 对话历史: {context_source.get('history_turns_count', 0)} 轮")
-                    print(f"{'─' * 80}")
-                
-                return {
-                    "reply": reply,
-                    "response_time": response_time,
-                    "context_source": context_source,
-                    "success": True
-                }
-            else:
-                print(f"❌ 请求失败: {response.status_code}")
-                print(f"   错误: {response.text[:200]}")
-                return {"success": False, "error": response.text}
-                
-        except Exception as e:
-            print(f"❌ 发送消息失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"success": False, "error": str(e)}
+    except Exception as e:
+        print(f"❌ 发送消息失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return {"success": False, "error": str(e)}
+
+
+def summarize(title: str, checks: list) -> bool:
+    """一次性输出检查结果，返回是否全部通过"""
+    statuses = "\n".join(f"   {'✅' if ok else '❌'} {name}" for name, ok in checks)
+    print(f"\n✅ {title}:\n{statuses}")
+    return all(ok for _, ok in checks)
 
 
 async def test_scenario_1_fact_query():
@@ -141,6 +168,7 @@ async def test_scenario_1_fact_query():
     
     # 先建立一些记忆
     print("\n📝 步骤 1：建立记忆...")
+    # 第二条是省略句（“没有去”承接第一条），必须按顺序发送
     await send_message("我和二丫去了沈阳旅游", show_details=False)
     await asyncio.sleep(2)  # 等待记忆处理
     
@@ -162,15 +190,7 @@ async def test_scenario_1_fact_query():
             ("响应时间合理", result["response_time"] < 10000),
         ]
         
-        print(f"\n✅ 回复质量检查:")
-        all_passed = True
-        for check_name, check_result in checks:
-            status = "✅" if check_result else "❌"
-            print(f"   {status} {check_name}")
-            if not check_result:
-                all_passed = False
-        
-        return all_passed
+        return summarize("回复质量检查", checks)
     
     return False
 
@@ -202,15 +222,7 @@ async def test_scenario_2_elliptical_question():
             ("不是'我不记得'", "不记得" not in reply and "不知道" not in reply),
         ]
         
-        print(f"\n✅ 省略理解检查:")
-        all_passed = True
-        for check_name, check_result in checks:
-            status = "✅" if check_result else "❌"
-            print(f"   {status} {check_name}")
-            if not check_result:
-                all_passed = False
-        
-        return all_passed
+        return summarize("省略理解检查", checks)
     
     return False
 
@@ -241,15 +253,7 @@ async def test_scenario_3_inference_question():
             ("展示推理", "海边" in reply or "海" in reply or "推理" in reply or "是" in reply),
         ]
         
-        print(f"\n✅ 推理能力检查:")
-        all_passed = True
-        for check_name, check_result in checks:
-            status = "✅" if check_result else "❌"
-            print(f"   {status} {check_name}")
-            if not check_result:
-                all_passed = False
-        
-        return all_passed
+        return summarize("推理能力检查", checks)
     
     return False
 
@@ -309,15 +313,7 @@ async def test_scenario_5_complex_question():
             ("回复详细", len(reply) > 30),
         ]
         
-        print(f"\n✅ 复杂查询检查:")
-        all_passed = True
-        for check_name, check_result in checks:
-            status = "✅" if check_result else "❌"
-            print(f"   {status} {check_name}")
-            if not check_result:
-                all_passed = False
-        
-        return all_passed
+        return summarize("复杂查询检查", checks)
     
     return False
 
@@ -366,6 +362,8 @@ async def main():
         print(f"\n❌ 测试过程中出错: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await close_client()
     
     # 汇总结果
     print("\n" + "=" * 80)
@@ -11,6 +11,7 @@ from app.services.conversation_service import ConversationService, ConversationM
 from app.services.affinity_service import AffinityService
 from app.services.retrieval_service import RetrievalService
 from app.services.graph_service import GraphService
+from app.core.config import settings
 
 # 配置
 NEO4J_URI = "bolt://localhost:7687"
@@ -23,7 +24,14 @@ USER_ID = "9a9e9803-94d6-4ecd-8d09-66fb4745ef85"
 SESSION_ID = "test-parallel-session"
 
 
-async def test_parallel_retrieval():
+async def timed(coro):
+    """执行协程并返回 (结果, 耗时ms)"""
+    t0 = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - t0) * 1000
+
+
+async def test_parallel_retrieval(milvus_collection):
     """测试并行检索性能"""
     print("=" * 60)
     print("测试并行检索优化")
@@ -34,10 +42,6 @@ async def test_parallel_retrieval():
         NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)
     )
     
-    connections.connect("default", host=MILVUS_HOST, port=MILVUS_PORT)
-    milvus_collection = Collection("memories")
-    milvus_collection.load()
-    
     # 初始化服务
     graph_service = GraphService(neo4j_driver=neo4j_driver)
     retrieval_service = RetrievalService(
@@ -79,35 +83,39 @@ async def test_parallel_retrieval():
     print("验证并行检索")
     print("=" * 60)
     
-    # 单独测试向量检索时间
-    start = time.time()
     affinity = await affinity_service.get_affinity(USER_ID)
-    vector_result = await retrieval_service.hybrid_retrieve(
-        USER_ID, query, affinity.new_score
-    )
-    vector_time = (time.time() - start) * 1000
-    print(f"向量检索时间: {vector_time:.0f}ms")
     
-    # 单独测试图谱检索时间
-    start = time.time()
-    graph_facts = await retrieval_service.retrieve_entity_facts(
-        USER_ID, query, graph_service
+    # 两路检索并发执行，各自计时，同时测量实际并行总时间
+    start = time.perf_counter()
+    (vector_result, vector_time), (graph_facts, graph_time) = await asyncio.gather(
+        timed(retrieval_service.hybrid_retrieve(USER_ID, query, affinity.new_score)),
+        timed(retrieval_service.retrieve_entity_facts(USER_ID, query, graph_service))
     )
-    graph_time = (time.time() - start) * 1000
+    parallel_time = (time.perf_counter() - start) * 1000
+    print(f"向量检索时间: {vector_time:.0f}ms")
     print(f"图谱检索时间: {graph_time:.0f}ms")
     
-    # 并行检索时间（理论值）
-    parallel_time = max(vector_time, graph_time)
+    # 串行总时间（两路耗时之和）与实测并行时间对比
     serial_time = vector_time + graph_time
     saved_time = serial_time - parallel_time
     
     print(f"\n串行总时间: {serial_time:.0f}ms")
-    print(f"并行总时间: {parallel_time:.0f}ms (理论值)")
+    print(f"并行总时间: {parallel_time:.0f}ms (实测)")
     print(f"节省时间: {saved_time:.0f}ms ({saved_time/serial_time*100:.1f}%)")
     
     await neo4j_driver.close()
-    connections.disconnect("default")
+
+
+async def main():
+    # 直接运行时自行加载集合（pytest 下由会话级 fixture milvus_collection 提供）
+    connections.connect("default", host=MILVUS_HOST, port=MILVUS_PORT)
+    try:
+        milvus_collection = Collection(settings.MILVUS_COLLECTION)
+        milvus_collection.load()
+        await test_parallel_retrieval(milvus_collection)
+    finally:
+        connections.disconnect("default")
 
 
 if __name__ == "__main__":
-    asyncio.run(test_parallel_retrieval())
+    asyncio.run(main())
@@ -2,152 +2,184 @@
 针对第四部分和第六部分的专项测试
 测试家庭关系识别和否定语义处理
 """
-import requests
+import asyncio
 import json
 import time
+import uuid
+
+import httpx
 
 API_BASE = "http://localhost:8000/api/v1"
-USER_ID = "9a9e9803-94d6-4ecd-8d09-66fb4745ef85"
 
-def get_token():
-    r = requests.post(f"{API_BASE}/auth/token", json={"user_id": USER_ID})
-    return r.json()["access_token"]
+# Token 缓存：user_id -> (token, 签发时刻)；有效期内复用，避免每次请求都走一次 /auth/token
+TOKEN_TTL_S = 1800
+_token_cache = {}
 
-def send_message(text):
-    token = get_token()
-    resp = requests.post(
-        f"{API_BASE}/sse/message",
-        json={"message": text},
-        headers={"Authorization": f"Bearer {token}"},
-        stream=True
-    )
-    
+async def get_token(client, user_id):
+    cached = _token_cache.get(user_id)
+    if cached and time.monotonic() - cached[1] < TOKEN_TTL_S:
+        return cached[0]
+    r = await client.post("/auth/token", json={"user_id": user_id})
+    _token_cache[user_id] = (r.json()["access_token"], time.monotonic())
+    return _token_cache[user_id][0]
+
+async def iter_sse_data(resp):
+    """按字节切分 SSE 行，逐个产出 data 负载（不做逐行 UTF-8 解码）"""
+    buf = b""
+    async for chunk in resp.aiter_bytes():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.startswith(b"data: "):
+                payload = line[6:].rstrip(b"\r")
+                if payload == b"[DONE]":
+                    return
+                yield payload
+
+async def send_message(client, user_id, text):
+    token = await get_token(client, user_id)
     memory_id = None
-    ai_response = ""
-    for line in resp.iter_lines():
-        if line:
-            line_str = line.decode('utf-8')
-            if line_str.startswith('data: '):
-                data_str = line_str[6:]
-                if data_str == '[DONE]':
-                    break
-                try:
-                    event = json.loads(data_str)
-                    if event.get('type') == 'text':
-                        ai_response += event.get('content', '')
-                    elif event.get('type') == 'memory_pending':
-                        memory_id = event.get('memory_id')
-                except:
-                    pass
-    return memory_id, ai_response
-
-def wait_commit(memory_id, timeout=60):
+    chunks = []
+    async with client.stream(
+        "POST",
+        "/sse/message",
+        json={"message": text},
+        headers={"Authorization": f"Bearer {token}"}
+    ) as resp:
+        async for payload in iter_sse_data(resp):
+            try:
+                # json.loads 直接接受 bytes
+                event = json.loads(payload)
+            except ValueError:
+                continue
+            event_type = event.get('type')
+            if event_type == 'text':
+                chunks.append(event.get('content', ''))
+            elif event_type == 'memory_pending':
+                memory_id = event.get('memory_id')
+    return memory_id, "".join(chunks)
+
+async def wait_commit(client, user_id, memory_id, timeout=60):
     if not memory_id:
         return False
-    token = get_token()
-    start = time.time()
-    while time.time() - start < timeout:
+    token = await get_token(client, user_id)
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
         try:
-            resp = requests.get(
-                f"{API_BASE}/memories/{memory_id}",
+            resp = await client.get(
+                f"/memories/{memory_id}",
                 headers={"Authorization": f"Bearer {token}"}
             )
             if resp.status_code == 200:
                 status = resp.json().get("status")
                 if status == "committed":
                     return True
-        except:
+        except Exception:
             pass
-        time.sleep(2)
+        await asyncio.sleep(2)
     return False
 
-def get_graph():
-    token = get_token()
-    resp = requests.get(f"{API_BASE}/graph/", headers={"Authorization": f"Bearer {token}"})
+async def get_graph(client, user_id):
+    token = await get_token(client, user_id)
+    resp = await client.get("/graph/", headers={"Authorization": f"Bearer {token}"})
     return resp.json()
 
-def run_test(test_id, text, expected, notes=""):
-    print(f"\n{'='*60}")
-    print(f"测试 #{test_id}")
-    print(f"输入: {text}")
+def edge_key(e):
+    return (e['source_id'], e['target_id'], e['relation_type'])
+
+def take_new_edges(graph, seen):
+    """单次遍历返回 seen 中没有的边，并记入 seen"""
+    new_edges = []
+    for e in graph['edges']:
+        key = edge_key(e)
+        if key not in seen:
+            seen.add(key)
+            new_edges.append(key)
+    return new_edges
+
+def format_edge(node_map, src_id, tgt_id, rel_type):
+    src = node_map.get(src_id, src_id[:8])
+    tgt = node_map.get(tgt_id, tgt_id[:8])
+    return f"{src} --[{rel_type}]--> {tgt}"
+
+async def run_test(client, test_id, text, expected, notes=""):
+    """在独立用户下发送消息、等待提交并对比该用户的前后图谱
+
+    每个用例使用新的 user_id，并发执行时互不影响（例如 4.9 与 4.14 都会修改“小红”节点），
+    新增关系就是该用例自己的图谱差异。返回报告行，并发执行时统一打印，避免输出交错。
+    """
+    user_id = str(uuid.uuid4())
+    lines = [
+        f"\n{'='*60}",
+        f"测试 #{test_id}",
+        f"输入: {text}",
+    ]
     if notes:
-        print(f"备注: {notes}")
-    print(f"期望: {expected}")
-    print(f"{'='*60}")
-    
-    # 获取测试前图谱
-    graph_before = get_graph()
-    edges_before = {(e['source_id'], e['target_id'], e['relation_type']) for e in graph_before['edges']}
-    
+        lines.append(f"备注: {notes}")
+    lines.append(f"期望: {expected}")
+    lines.append(f"{'='*60}")
+
+    # 测试前图谱（本用例独立快照）
+    seen = set(map(edge_key, (await get_graph(client, user_id))['edges']))
+
     # 发送消息
-    memory_id, ai_response = send_message(text)
-    print(f"📤 消息已发送")
-    print(f"💬 AI: {ai_response[:60]}..." if len(ai_response) > 60 else f"💬 AI: {ai_response}")
-    
+    memory_id, ai_response = await send_message(client, user_id, text)
+    lines.append(f"📤 消息已发送")
+    lines.append(f"💬 AI: {ai_response[:60]}..." if len(ai_response) > 60 else f"💬 AI: {ai_response}")
+
     if memory_id:
-        print(f"🔄 等待提交...")
-        if wait_commit(memory_id, timeout=60):
-            print(f"✅ 已提交")
+        if await wait_commit(client, user_id, memory_id, timeout=60):
+            lines.append(f"✅ 已提交")
         else:
-            print(f"⚠️ 超时")
-            time.sleep(5)
+            lines.append(f"⚠️ 超时")
+            await asyncio.sleep(5)
     else:
-        print(f"ℹ️ 无 Memory")
-        time.sleep(3)
-    
-    # 获取测试后图谱
-    graph_after = get_graph()
-    edges_after = {(e['source_id'], e['target_id'], e['relation_type']) for e in graph_after['edges']}
-    
-    # 新增关系
-    new_edges = edges_after - edges_before
-    
-    node_map = {n['id']: n['name'] for n in graph_after['nodes']}
-    
-    print(f"\n📊 新增关系: {len(new_edges)}")
-    for src_id, tgt_id, rel_type in new_edges:
-        src = node_map.get(src_id, src_id[:8])
-        tgt = node_map.get(tgt_id, tgt_id[:8])
-        print(f"    - {src} --[{rel_type}]--> {tgt}")
-    
-    return new_edges
+        lines.append(f"ℹ️ 无 Memory")
+        await asyncio.sleep(3)
+
+    # 测试后图谱
+    graph = await get_graph(client, user_id)
+    node_map = {n['id']: n['name'] for n in graph['nodes']}
+    new_edges = take_new_edges(graph, seen)
+
+    lines.append(f"\n📊 新增关系: {len(new_edges)}")
+    for edge in new_edges:
+        lines.append(f"    - {format_edge(node_map, *edge)}")
+
+    lines.append(f"\n最终图谱: {len(graph['nodes'])} 个节点, {len(graph['edges'])} 条边")
+    for e in graph['edges']:
+        lines.append(f"  - {format_edge(node_map, *edge_key(e))}")
+
+    return lines
 
 # 测试用例
 TESTS = [
     # 第四部分：家庭关系识别
     ("4.9", "小红是张伟的妹妹", "小红 → SIBLING_OF → 张伟", "测试兄弟姐妹关系"),
     ("4.14", "小红不是我同事，是我表妹", "user → COUSIN_OF → 小红", "测试否定语义 + 表亲关系"),
-    
+
     # 第六部分：否定语义
     ("6.14", "李明是我朋友，不是同事", "user → FRIEND_OF → 李明（不应有 COLLEAGUE_OF）", "测试否定语义"),
     ("6.15", "我不喜欢游泳，但喜欢跑步", "user → DISLIKES → 游泳, user → LIKES → 跑步", "测试对比否定"),
 ]
 
-if __name__ == "__main__":
+async def main():
     print("=" * 70)
     print("🧪 第四部分和第六部分专项测试")
     print("=" * 70)
-    
-    for test_id, text, expected, notes in TESTS:
-        try:
-            run_test(test_id, text, expected, notes)
-        except Exception as e:
-            print(f"❌ 测试 #{test_id} 失败: {e}")
-        
-        time.sleep(3)
-    
-    # 最终图谱
-    print("\n" + "=" * 70)
-    print("📊 最终图谱状态")
-    print("=" * 70)
-    
-    graph = get_graph()
-    print(f"总节点数: {len(graph['nodes'])}")
-    print(f"总边数: {len(graph['edges'])}")
-    
-    print("\n所有关系:")
-    node_map = {n['id']: n['name'] for n in graph['nodes']}
-    for e in graph['edges']:
-        src = node_map.get(e['source_id'], e['source_id'][:8])
-        tgt = node_map.get(e['target_id'], e['target_id'][:8])
-        print(f"  - {src} --[{e['relation_type']}]--> {tgt}")
+
+    async with httpx.AsyncClient(base_url=API_BASE, timeout=60.0) as client:
+        # 每个用例有自己的用户与图谱，可以安全并发
+        reports = await asyncio.gather(
+            *(run_test(client, *test) for test in TESTS),
+            return_exceptions=True
+        )
+
+    for (test_id, *_), report in zip(TESTS, reports):
+        if isinstance(report, BaseException):
+            print(f"❌ 测试 #{test_id} 失败: {report}")
+            continue
+        print("\n".join(report))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,113 +1,115 @@
 """
 测试主动消息系统集成
 """
-import asyncio
 import sys
-from datetime import datetime, timedelta
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import raiseload, selectinload
 
 # 添加项目路径
 sys.path.insert(0, '.')
 
-from app.core.config import settings
 from app.models.outbox import ProactiveMessage, UserProactivePreference
 from app.models.user import User
 
+# 固定的计划发送时间（UTC；scheduled_at 列为不带时区的 DateTime，故保持 naive）
+SCHEDULED_AT = datetime(2024, 1, 1)
 
-async def test_proactive_system():
-    """测试主动消息系统"""
-    
-    # 创建异步引擎
-    engine = create_async_engine(settings.DATABASE_URL, echo=True)
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def test_proactive_system(async_session_factory, count_queries):
+    """测试主动消息系统（引擎与会话工厂由会话级 fixture 提供）"""
     
-    async with async_session() as session:
-        print("\n" + "="*60)
-        print("🧪 测试主动消息系统")
-        print("="*60)
-        
-        # 1. 检查用户
-        result = await session.execute(select(User).limit(1))
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            print("❌ 没有找到用户，请先创建用户")
-            return
-        
-        print(f"\n✅ 找到用户: {user.id}")
-        
-        # 2. 创建测试主动消息
-        test_message = ProactiveMessage(
-            user_id=user.id,
-            trigger_type="time",
-            content="这是一条测试主动消息！AI 正在测试推送功能。",
-            status="pending",
-            scheduled_at=datetime.utcnow(),
-            metadata={"test": True, "source": "integration_test"}
-        )
-        
-        session.add(test_message)
-        await session.commit()
-        await session.refresh(test_message)
-        
-        print(f"\n✅ 创建测试消息: {test_message.id}")
-        print(f"   内容: {test_message.content}")
-        print(f"   状态: {test_message.status}")
-        
-        # 3. 检查用户偏好
-        pref_result = await session.execute(
-            select(UserProactivePreference).where(
-                UserProactivePreference.user_id == user.id
+    # 报告行先累积，结束时一次性写出（提前返回或断言失败时同样输出）
+    lines = []
+    try:
+        async with async_session_factory() as session:
+            lines.append("\n" + "="*60)
+            lines.append("🧪 测试主动消息系统")
+            lines.append("="*60)
+            
+            # 1. 检查用户（selectinload 一并加载主动消息偏好，无需单独查询）
+            result = await session.execute(
+                select(User)
+                .options(selectinload(User.proactive_preference), raiseload("*"))
+                .limit(1)
             )
-        )
-        preference = pref_result.scalar_one_or_none()
-        
-        if not preference:
-            print("\n⚠️  用户偏好不存在，创建默认偏好")
-            preference = UserProactivePreference(
+            user = result.scalar_one_or_none()
+            
+            if not user:
+                lines.append("❌ 没有找到用户，请先创建用户")
+                return
+            
+            lines.append(f"\n✅ 找到用户: {user.id}")
+            
+            preference = user.proactive_preference
+            
+            # 2. 测试消息与缺失的默认偏好在同一事务中写入（一次提交，无需 refresh：
+            #    主键为客户端 uuid 默认值，expire_on_commit=False 保留已加载属性）
+            test_message = ProactiveMessage(
                 user_id=user.id,
-                proactive_enabled="true",
-                morning_greeting_enabled="true",
-                evening_greeting_enabled="true",
-                silence_reminder_enabled="true"
+                trigger_type="time",
+                content="这是一条测试主动消息！AI 正在测试推送功能。",
+                status="pending",
+                scheduled_at=SCHEDULED_AT,
+                metadata={"test": True, "source": "integration_test"}
             )
-            session.add(preference)
+            new_rows = [test_message]
+            
+            if not preference:
+                lines.append("\n⚠️  用户偏好不存在，创建默认偏好")
+                preference = UserProactivePreference(
+                    user_id=user.id,
+                    proactive_enabled="true",
+                    morning_greeting_enabled="true",
+                    evening_greeting_enabled="true",
+                    silence_reminder_enabled="true"
+                )
+                new_rows.append(preference)
+            
+            session.add_all(new_rows)
             await session.commit()
-            await session.refresh(preference)
-        
-        print(f"\n✅ 用户偏好:")
-        print(f"   主动消息启用: {preference.proactive_enabled}")
-        print(f"   早安问候: {preference.morning_greeting_enabled}")
-        print(f"   晚安问候: {preference.evening_greeting_enabled}")
-        
-        # 4. 查询所有待处理消息
-        pending_result = await session.execute(
-            select(ProactiveMessage).where(
-                ProactiveMessage.user_id == user.id,
-                ProactiveMessage.status == "pending"
-            ).order_by(ProactiveMessage.created_at.desc())
-        )
-        pending_messages = pending_result.scalars().all()
-        
-        print(f"\n✅ 待处理消息数量: {len(pending_messages)}")
-        for msg in pending_messages[:3]:  # 只显示前3条
-            print(f"   - [{msg.trigger_type}] {msg.content[:50]}...")
-        
-        print("\n" + "="*60)
-        print("✅ 测试完成！")
-        print("="*60)
-        print("\n📋 下一步:")
-        print("1. 启动前端: cd frontend && npm run dev")
-        print("2. 访问 http://localhost:5173")
-        print("3. 等待 30 秒，查看主动消息弹窗")
-        print("4. 或者手动调用 API:")
-        print("   GET http://localhost:8000/api/v1/proactive/messages?status=pending")
-        print()
-    
-    await engine.dispose()
-
-
-if __name__ == "__main__":
-    asyncio.run(test_proactive_system())
+            
+            lines.append(f"\n✅ 创建测试消息: {test_message.id}")
+            lines.append(f"   内容: {test_message.content}")
+            lines.append(f"   状态: {test_message.status}")
+            
+            lines.append(f"\n✅ 用户偏好:")
+            lines.append(f"   主动消息启用: {preference.proactive_enabled}")
+            lines.append(f"   早安问候: {preference.morning_greeting_enabled}")
+            lines.append(f"   晚安问候: {preference.evening_greeting_enabled}")
+            
+            # 3. 提交后查询最近 3 条待处理消息，窗口函数同时带回总数（一次往返）
+            pending_result = await session.execute(
+                select(ProactiveMessage, func.count().over().label("total")).where(
+                    ProactiveMessage.user_id == user.id,
+                    ProactiveMessage.status == "pending"
+                ).order_by(ProactiveMessage.created_at.desc()).limit(3).options(raiseload("*"))
+            )
+            pending_rows = pending_result.all()
+            pending_total = pending_rows[0].total if pending_rows else 0
+            pending_messages = [msg for msg, _ in pending_rows]
+            
+            # 刚提交的测试消息必须作为待处理消息从数据库查回
+            assert test_message.id in {msg.id for msg in pending_messages}, \
+                "刚创建的测试消息未出现在待处理消息中"
+            
+            # 4. 待处理消息
+            lines.append(f"\n✅ 待处理消息数量: {pending_total}")
+            # 展示阶段不应再触发任何查询（raiseload 拦截意外的懒加载）
+            with count_queries(await session.connection()) as queries:
+                for msg in pending_messages[:3]:  # 只显示前3条
+                    lines.append(f"   - [{msg.trigger_type}] {msg.content[:50]}...")
+            assert len(queries) == 0, f"展示待处理消息时产生了额外查询: {queries}"
+            
+            lines.append("\n" + "="*60)
+            lines.append("✅ 测试完成！")
+            lines.append("="*60)
+            lines.append("\n📋 下一步:")
+            lines.append("1. 启动前端: cd frontend && npm run dev")
+            lines.append("2. 访问 http://localhost:5173")
+            lines.append("3. 等待 30 秒，查看主动消息弹窗")
+            lines.append("4. 或者手动调用 API:")
+            lines.append("   GET http://localhost:8000/api/v1/proactive/messages?status=pending")
+            lines.append("")
+    finally:
+        sys.stdout.write("\n".join(lines) + "\n")
@@ -1,75 +1,121 @@
 """属性测试 - 使用 Hypothesis"""
-import math
+import hashlib
+import hmac
+import json
+from bisect import bisect_right
 from datetime import datetime, timedelta
 from hypothesis import given, strategies as st, settings as hypothesis_settings
+from hypothesis.extra import numpy as hnp
+import numpy as np
 import pytest
 
+# 向量化属性测试的每批样本数
+BATCH_SIZE = 100
+
+# 多个测试共用的策略与设置（模块级构造一次）
+_UNIT = st.floats(min_value=-1.0, max_value=1.0)
+_UNIT_POS = st.floats(min_value=0.0, max_value=1.0)
+_DAYS = st.integers(min_value=0, max_value=365)
+_FAST = hypothesis_settings(max_examples=100)
+
+# 检索分数权重：cosine_sim, edge_weight, affinity_bonus, recency_score（权重和为 1，导入时校验一次）
+_RETRIEVAL_WEIGHTS = np.array([0.4, 0.3, 0.2, 0.1])
+assert abs(_RETRIEVAL_WEIGHTS.sum() - 1.0) < 1e-9, "Weights should sum to 1"
+
+# 审计签名 HMAC 原型：密钥只初始化一次，每次签名 copy() 后再 update
+AUDIT_SECRET_KEY = "test_secret_key_for_hmac"
+_AUDIT_HMAC_PROTO = hmac.new(AUDIT_SECRET_KEY.encode(), digestmod=hashlib.sha256)
+# 审计数据的规范化 JSON 编码器（键排序、紧凑分隔符），全模块复用
+_AUDIT_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+# 好感度状态区间：_STATE_BOUNDS[i] 是 _STATES[i + 1] 的下界（含）
+_STATE_BOUNDS = (0.0, 0.3, 0.5, 0.7)
+_STATES = ("stranger", "acquaintance", "friend", "close_friend", "best_friend")
+_STATE_SET = frozenset(_STATES)
+
+# 模型 Tier 取值
+_TIERS = ("tier0", "tier1", "tier2")
+_TIER_SET = frozenset(_TIERS)
+
+
+def _decay(weight, rate, days):
+    """边权重衰减公式 w × exp(-r × d)（标量或 ndarray 均可）"""
+    return weight * np.exp(-rate * days)
+
+
+def _scan_affinity(changes):
+    """按顺序累加好感度变化并钳制到 [-1, 1]，返回逐步的 (old, new, delta) 数组
+
+    钳制不满足结合律，无法用 np.clip(np.cumsum(...)) 精确替代，只能顺序扫描。
+    """
+    old = []
+    new = []
+    score = 0.0
+    for change in changes:
+        old.append(score)
+        score += change
+        # 条件表达式代替 max/min 嵌套调用，省去两次函数调用
+        score = -1.0 if score < -1.0 else (1.0 if score > 1.0 else score)
+        new.append(score)
+    # 逐元素写 ndarray 比 list.append 慢，循环结束后一次性转换
+    old = np.array(old)
+    new = np.array(new)
+    return old, new, new - old
+
 
 class TestAffinityProperties:
     """好感度属性测试"""
     
     @given(
-        current_score=st.floats(min_value=-1.0, max_value=1.0),
-        user_initiated=st.booleans(),
-        emotion_valence=st.floats(min_value=-1.0, max_value=1.0),
-        memory_confirmation=st.booleans(),
-        correction=st.booleans(),
-        silence_days=st.integers(min_value=0, max_value=365)
+        current_score=hnp.arrays(np.float64, BATCH_SIZE, elements=_UNIT),
+        user_initiated=hnp.arrays(np.bool_, BATCH_SIZE),
+        emotion_valence=hnp.arrays(np.float64, BATCH_SIZE, elements=_UNIT),
+        memory_confirmation=hnp.arrays(np.bool_, BATCH_SIZE),
+        correction=hnp.arrays(np.bool_, BATCH_SIZE),
+        silence_days=hnp.arrays(np.int64, BATCH_SIZE, elements=_DAYS)
     )
-    @hypothesis_settings(max_examples=100)
+    @hypothesis_settings(max_examples=20, database=None)  # 批量数组回放旧示例易触发 data_too_large
     def test_affinity_score_bounds(
         self,
-        current_score: float,
-        user_initiated: bool,
-        emotion_valence: float,
-        memory_confirmation: bool,
-        correction: bool,
-        silence_days: int
+        current_score: np.ndarray,
+        user_initiated: np.ndarray,
+        emotion_valence: np.ndarray,
+        memory_confirmation: np.ndarray,
+        correction: np.ndarray,
+        silence_days: np.ndarray
     ):
         """
         Property 3: 好感度分数边界不变量
         
         对于任意好感度信号组合，更新后的好感度分数应当始终在 [-1, 1] 范围内
-        """
-        # 实现好感度更新逻辑
-        delta = 0.0
-        
-        if user_initiated:
-            delta += 0.05
-        if emotion_valence > 0:
-            delta += 0.02 * emotion_valence
-        if memory_confirmation:
-            delta += 0.03
-        if correction:
-            delta -= 0.02
-        if emotion_valence < -0.5:
-            delta -= 0.01
+        （每个示例是一批 BATCH_SIZE 组信号，向量化计算）
+        """
+        # 实现好感度更新逻辑（分支改为布尔掩码）
+        delta = (
+            0.05 * user_initiated
+            + 0.02 * np.maximum(emotion_valence, 0.0)
+            + 0.03 * memory_confirmation
+            - 0.02 * correction
+            - 0.01 * (emotion_valence < -0.5)
+        )
         
         decay = 0.01 * silence_days
-        new_score = max(-1.0, min(1.0, current_score + delta - decay))
+        new_score = np.clip(current_score + delta - decay, -1.0, 1.0)
         
         # 验证边界
-        assert -1.0 <= new_score <= 1.0, f"Score {new_score} out of bounds"
+        in_bounds = (new_score >= -1.0) & (new_score <= 1.0)
+        assert np.all(in_bounds), f"Scores out of bounds: {new_score[~in_bounds]}"
     
-    @given(score=st.floats(min_value=-1.0, max_value=1.0))
-    @hypothesis_settings(max_examples=100)
+    @given(score=_UNIT)
+    @_FAST
     def test_affinity_state_mapping(self, score: float):
         """
         Property 4: 好感度状态映射正确性
         
         对于任意好感度分数，状态映射应当满足定义的区间
         """
-        # 实现状态映射
-        if score < 0:
-            state = "stranger"
-        elif score < 0.3:
-            state = "acquaintance"
-        elif score < 0.5:
-            state = "friend"
-        elif score < 0.7:
-            state = "close_friend"
-        else:
-            state = "best_friend"
+        # 实现状态映射（区间下界二分查找）
+        state = _STATES[bisect_right(_STATE_BOUNDS, score)]
         
         # 验证映射正确性
         if state == "stranger":
@@ -88,49 +134,50 @@ class TestDecayProperties:
     """边权重衰减属性测试"""
     
     @given(
-        stored_weight=st.floats(min_value=0.01, max_value=1.0),
-        decay_rate=st.floats(min_value=0.001, max_value=0.1),
-        days=st.integers(min_value=0, max_value=365)
+        stored_weight=hnp.arrays(np.float64, BATCH_SIZE, elements=st.floats(min_value=0.01, max_value=1.0)),
+        decay_rate=hnp.arrays(np.float64, BATCH_SIZE, elements=st.floats(min_value=0.001, max_value=0.1)),
+        days=hnp.arrays(np.int64, BATCH_SIZE, elements=_DAYS)
     )
-    @hypothesis_settings(max_examples=100)
+    @hypothesis_settings(max_examples=20, database=None)  # 批量数组回放旧示例易触发 data_too_large
     def test_decay_formula_correctness(
         self,
-        stored_weight: float,
-        decay_rate: float,
-        days: int
+        stored_weight: np.ndarray,
+        decay_rate: np.ndarray,
+        days: np.ndarray
     ):
         """
         Property 2: 边权重衰减公式正确性
         
         对于任意初始权重 w∈(0,1]、衰减率 r∈(0,1) 和天数 d≥0，
         应用衰减公式后的新权重应等于 w × exp(-r × d)
+        （每个示例是一批 BATCH_SIZE 组参数，向量化计算）
         """
         # 计算衰减后的权重
-        new_weight = stored_weight * math.exp(-decay_rate * days)
+        new_weight = _decay(stored_weight, decay_rate, days)
         
-        # 验证公式正确性
-        expected = stored_weight * math.exp(-decay_rate * days)
-        assert abs(new_weight - expected) < 1e-6, f"Decay formula mismatch"
+        # 验证公式正确性：与逐日复合衰减 w × (e^-r)^d 一致（独立推导，而非重复同一表达式）
+        expected = stored_weight * np.exp(-decay_rate) ** days
+        assert np.all(np.abs(new_weight - expected) < 1e-6), f"Decay formula mismatch"
         
         # 验证权重单调递减
-        if days > 0:
-            assert new_weight <= stored_weight, "Weight should decrease over time"
+        decayed = days > 0
+        assert np.all(new_weight[decayed] <= stored_weight[decayed]), "Weight should decrease over time"
         
         # 验证权重非负
-        assert new_weight >= 0, "Weight should be non-negative"
+        assert np.all(new_weight >= 0), "Weight should be non-negative"
 
 
 class TestRetrievalProperties:
     """检索属性测试"""
     
     @given(
-        cosine_sim=st.floats(min_value=0.0, max_value=1.0),
-        edge_weight=st.floats(min_value=0.0, max_value=1.0),
-        affinity_score=st.floats(min_value=-1.0, max_value=1.0),
-        valence=st.floats(min_value=-1.0, max_value=1.0),
-        recency_score=st.floats(min_value=0.0, max_value=1.0)
+        cosine_sim=_UNIT_POS,
+        edge_weight=_UNIT_POS,
+        affinity_score=_UNIT,
+        valence=_UNIT,
+        recency_score=_UNIT_POS
     )
-    @hypothesis_settings(max_examples=100)
+    @_FAST
     def test_retrieval_score_decomposition(
         self,
         cosine_sim: float,
@@ -148,15 +195,11 @@ class TestRetrievalProperties:
         # 计算好感度加成
         affinity_bonus = affinity_score if valence > 0 else 0
         
-        # 计算最终分数
-        final_score = (
-            cosine_sim * 0.4 +
-            edge_weight * 0.3 +
-            affinity_bonus * 0.2 +
-            recency_score * 0.1
-        )
+        # 计算最终分数（权重向量与四个因子点积）
+        factors = np.array([cosine_sim, edge_weight, affinity_bonus, recency_score])
+        final_score = float(_RETRIEVAL_WEIGHTS @ factors)
         
-        # 验证分数分解
+        # 验证分数分解：逐项加权求和与点积一致
         reconstructed = (
             cosine_sim * 0.4 +
             edge_weight * 0.3 +
@@ -165,9 +208,6 @@ class TestRetrievalProperties:
         )
         
         assert abs(final_score - reconstructed) < 1e-6, "Score decomposition mismatch"
-        
-        # 验证权重和为 1
-        assert abs(0.4 + 0.3 + 0.2 + 0.1 - 1.0) < 1e-6, "Weights should sum to 1"
 
 
 class TestIdempotencyProperties:
@@ -191,18 +231,20 @@ class TestIdempotencyProperties:
         """
         # 模拟幂等性检查
         processed_keys = set()
-        results = []
         
-        for _ in range(request_count):
+        def process() -> str:
             if idempotency_key not in processed_keys:
                 processed_keys.add(idempotency_key)
-                results.append("created")
-            else:
-                results.append("duplicate")
+                return "created"
+            return "duplicate"
+        
+        results = [process() for _ in range(request_count)]
         
-        # 验证只有一个 "created"
+        # 验证只有一个 "created"，且是首次请求
         created_count = results.count("created")
         assert created_count == 1, f"Expected 1 creation, got {created_count}"
+        assert results[0] == "created"
+        assert processed_keys == {idempotency_key}
 
 
 class TestDeletionProperties:
@@ -339,40 +381,29 @@ class TestConcurrentIdempotencyProperties:
         对于任意携带相同 idempotency_key 的并发请求（N > 1），
         系统必须保证数据库中仅产生 1 条 Memory 记录
         """
-        import threading
         from collections import Counter
         
-        # 模拟数据库（使用锁保护）
-        db_lock = threading.Lock()
+        # 模拟数据库（幂等检查与写入在同一临界区内，这里按请求顺序逐个执行即可）
         memories = {}
         outbox_events = {}
         results = []
         
         def process_request(request_id: int):
             """模拟处理请求"""
-            with db_lock:
-                # 检查幂等键
-                if idempotency_key in memories:
-                    results.append(("duplicate", memories[idempotency_key]))
-                    return
-                
-                # 创建记录
-                memory_id = f"memory_{request_id}"
-                memories[idempotency_key] = memory_id
-                outbox_events[idempotency_key] = f"event_{request_id}"
-                results.append(("created", memory_id))
-        
-        # 并发执行
-        threads = []
-        for i in range(concurrent_requests):
-            t = threading.Thread(target=process_request, args=(i,))
-            threads.append(t)
-        
-        for t in threads:
-            t.start()
+            # 检查幂等键
+            if idempotency_key in memories:
+                results.append(("duplicate", memories[idempotency_key]))
+                return
+            
+            # 创建记录
+            memory_id = f"memory_{request_id}"
+            memories[idempotency_key] = memory_id
+            outbox_events[idempotency_key] = f"event_{request_id}"
+            results.append(("created", memory_id))
         
-        for t in threads:
-            t.join()
+        # 依次执行所有请求
+        for i in range(concurrent_requests):
+            process_request(i)
         
         # 验证结果
         result_types = Counter(r[0] for r in results)
@@ -436,35 +467,40 @@ class TestEventualConsistencyProperties:
         
         验证在有重试机制的情况下，所有写入最终都会成功
         """
-        import random
-        
         # 模拟写入状态
+        max_retries = 5
         postgres_writes = set()
-        neo4j_writes = set()
-        milvus_writes = set()
+        neo4j_log = []   # 按实际写入顺序记录，用于发现丢失或重复写入
+        milvus_log = []
         
-        max_retries = 5
+        # 每条写入每次尝试的成败一次性批量抽样（按输入定种子，保证示例可复现）
+        rng = np.random.default_rng(write_count)
+        attempt_ok = rng.random((write_count, max_retries)) >= failure_rate
+        
+        def write_downstream(memory_id: str):
+            neo4j_log.append(memory_id)
+            milvus_log.append(memory_id)
         
         for i in range(write_count):
             memory_id = f"memory_{i}"
             postgres_writes.add(memory_id)  # Postgres 总是成功
             
-            # 模拟 Neo4j/Milvus 写入（可能失败）
-            retries = 0
-            while retries < max_retries:
-                if random.random() > failure_rate:
-                    neo4j_writes.add(memory_id)
-                    milvus_writes.add(memory_id)
+            # 模拟 Neo4j/Milvus 写入（可能失败），成功即停止重试
+            for attempt in range(max_retries):
+                if attempt_ok[i, attempt]:
+                    write_downstream(memory_id)
                     break
-                retries += 1
             else:
-                # 超过重试次数，仍然添加（模拟最终成功）
-                neo4j_writes.add(memory_id)
-                milvus_writes.add(memory_id)
+                # 超过重试次数，由补偿任务最终写入（模拟最终成功）
+                write_downstream(memory_id)
+        
+        # 验证没有重复写入
+        assert len(neo4j_log) == len(set(neo4j_log)), "Neo4j received duplicate writes"
+        assert len(milvus_log) == len(set(milvus_log)), "Milvus received duplicate writes"
         
-        # 验证最终一致性
-        assert postgres_writes == neo4j_writes, "Neo4j should eventually have all records"
-        assert postgres_writes == milvus_writes, "Milvus should eventually have all records"
+        # 验证最终一致性（没有丢失写入）
+        assert postgres_writes == set(neo4j_log), "Neo4j should eventually have all records"
+        assert postgres_writes == set(milvus_log), "Milvus should eventually have all records"
     
     def test_slo_lag_calculation(self):
         """
@@ -472,20 +508,17 @@ class TestEventualConsistencyProperties:
         
         SLO: Median Lag < 2s, P95 Lag < 30s
         """
-        import statistics
-        
         # 模拟延迟数据（毫秒）
-        lags = [
+        lags = np.asarray([
             100, 150, 200, 180, 220,  # 正常
             500, 800, 1000, 1200,     # 稍慢
             5000, 10000, 25000        # 高峰
-        ]
+        ])
         
-        # 计算指标
-        median_lag = statistics.median(lags)
-        sorted_lags = sorted(lags)
-        p95_index = int(len(sorted_lags) * 0.95)
-        p95_lag = sorted_lags[min(p95_index, len(sorted_lags) - 1)]
+        # 计算指标（P95 只需选出第 k 小，用 partition 代替全排序）
+        median_lag = float(np.median(lags))
+        p95_index = min(int(len(lags) * 0.95), len(lags) - 1)
+        p95_lag = float(np.partition(lags, p95_index)[p95_index])
         
         # SLO 检查
         slo_median = 2000  # 2s
@@ -517,64 +550,49 @@ class TestGDPRDeletionProperties:
         对于任意被删除的记录，后续的任何检索操作都不应返回该记录
         无论是列表查询、搜索查询还是直接 ID 查询
         """
-        # 模拟记忆数据库
-        memories = [
-            {
-                "id": f"memory_{i}",
-                "user_id": str(user_id),
-                "content": f"Memory content {i}",
-                "status": "committed",
-                "embedding": [0.1] * 768
-            }
-            for i in range(memory_count)
-        ]
+        # 模拟记忆数据库（列式存储：ids 为记录下标，status 0=committed 1=deleted）
+        ids = np.arange(memory_count)
+        status = np.zeros(memory_count, dtype=np.int8)
         
         # 选择要删除的记忆
         if delete_selective:
             # 随机选择一半删除
             delete_count = max(1, memory_count // 2)
-            to_delete = memories[:delete_count]
         else:
             # 全部删除
-            to_delete = memories
+            delete_count = memory_count
         
         # 执行逻辑删除
-        deleted_ids = set()
-        for memory in to_delete:
-            memory["status"] = "deleted"
-            deleted_ids.add(memory["id"])
+        status[:delete_count] = 1
+        deleted_ids = ids[:delete_count]
         
         # 模拟检索函数（只返回非删除记录）
         def retrieve_memories(query: str = None):
-            return [m for m in memories if m["status"] != "deleted"]
+            return ids[status == 0]
         
         def search_memories(query: str):
             # 模拟向量搜索，但过滤已删除
-            return [m for m in memories if m["status"] != "deleted"]
+            return ids[status == 0]
         
-        def get_memory_by_id(memory_id: str):
-            for m in memories:
-                if m["id"] == memory_id:
-                    if m["status"] == "deleted":
-                        return None  # 已删除，不返回
-                    return m
-            return None
+        def get_memory_by_id(memory_id: int):
+            if status[memory_id] == 1:
+                return None  # 已删除，不返回
+            return memory_id
         
         # 验证 Property 7
         # 1. 列表查询不返回已删除记录
         retrieved = retrieve_memories()
-        for r in retrieved:
-            assert r["id"] not in deleted_ids, "Deleted memory found in list query"
+        assert (status[retrieved] == 0).all(), "Deleted memory found in list query"
         
         # 2. 搜索查询不返回已删除记录
         searched = search_memories("test query")
-        for s in searched:
-            assert s["id"] not in deleted_ids, "Deleted memory found in search query"
+        assert not np.isin(searched, deleted_ids).any(), "Deleted memory found in search query"
         
         # 3. 直接 ID 查询不返回已删除记录
+        assert (status[deleted_ids] == 1).all()
         for deleted_id in deleted_ids:
             result = get_memory_by_id(deleted_id)
-            assert result is None, f"Deleted memory {deleted_id} still retrievable by ID"
+            assert result is None, f"Deleted memory memory_{deleted_id} still retrievable by ID"
     
     @given(
         deletion_request_time=st.datetimes(
@@ -637,16 +655,11 @@ class TestGDPRDeletionProperties:
         对于任意删除操作，必须生成可验证的审计记录
         审计签名必须能够证明删除已执行
         """
-        import hashlib
-        import hmac
-        import json
-        
-        SECRET_KEY = "test_secret_key_for_hmac"
-        
         def generate_audit_hash(data: dict) -> str:
-            """生成审计数据的 HMAC 签名"""
-            message = json.dumps(data, sort_keys=True).encode()
-            return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+            """生成审计数据的 HMAC 签名（复制预置密钥的原型，省去每次的密钥扩展）"""
+            h = _AUDIT_HMAC_PROTO.copy()
+            h.update(_AUDIT_ENCODER.encode(data).encode())
+            return h.hexdigest()
         
         def verify_audit_signature(data: dict, signature: str) -> bool:
             """验证审计签名"""
@@ -679,13 +692,15 @@ class TestGDPRDeletionProperties:
         assert signature != other_signature, "Different data should produce different signatures"
     
     @given(
-        memory_ids=st.lists(st.uuids().map(str), min_size=1, max_size=20),
+        size=st.integers(min_value=1, max_value=20),
+        seed=st.integers(min_value=0, max_value=2**32 - 1),
         concurrent_deletions=st.integers(min_value=1, max_value=5)
     )
     @hypothesis_settings(max_examples=30)
     def test_concurrent_deletion_idempotency(
         self,
-        memory_ids: list,
+        size: int,
+        seed: int,
         concurrent_deletions: int
     ):
         """
@@ -693,38 +708,34 @@ class TestGDPRDeletionProperties:
         
         对于同一记录的并发删除请求，只应产生一条审计记录
         """
-        import threading
         from collections import Counter
         
-        # 模拟数据库
-        db_lock = threading.Lock()
-        memories = {mid: {"status": "committed"} for mid in memory_ids}
+        # 一次取出 16 × size 个随机字节，切成 128 位十六进制 ID
+        raw = np.random.default_rng(seed).bytes(16 * size)
+        memory_ids = [raw[i * 16:(i + 1) * 16].hex() for i in range(size)]
+        
+        # 模拟数据库（列式：ID → 下标，status 0=committed 1=deleted）
+        id_to_idx = {mid: i for i, mid in enumerate(memory_ids)}
+        status = np.zeros(len(memory_ids), dtype=np.int8)
         audit_records = []
         
         def delete_memory(memory_id: str, request_id: int):
             """模拟删除操作"""
-            with db_lock:
-                if memory_id in memories and memories[memory_id]["status"] != "deleted":
-                    memories[memory_id]["status"] = "deleted"
-                    audit_records.append({
-                        "memory_id": memory_id,
-                        "request_id": request_id,
-                        "action": "deleted"
-                    })
-                    return "deleted"
-                return "already_deleted"
-        
-        # 并发执行删除
-        threads = []
+            i = id_to_idx.get(memory_id)
+            if i is not None and status[i] == 0:
+                status[i] = 1
+                audit_records.append({
+                    "memory_id": memory_id,
+                    "request_id": request_id,
+                    "action": "deleted"
+                })
+                return "deleted"
+            return "already_deleted"
+        
+        # 依次执行所有删除请求
         for memory_id in memory_ids:
             for req_id in range(concurrent_deletions):
-                t = threading.Thread(target=delete_memory, args=(memory_id, req_id))
-                threads.append(t)
-        
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join()
+                delete_memory(memory_id, req_id)
         
         # 验证结果
         # 每个 memory_id 只应有一条审计记录
@@ -735,8 +746,7 @@ class TestGDPRDeletionProperties:
                 f"Memory {memory_id} has {audit_by_memory[memory_id]} audit records, expected 1"
         
         # 所有记忆都应该是 deleted 状态
-        for memory_id in memory_ids:
-            assert memories[memory_id]["status"] == "deleted"
+        assert (status == 1).all()
 
 
 class TestAuditTrailProperties:
@@ -761,6 +771,8 @@ class TestAuditTrailProperties:
         对于任意操作序列，审计日志必须完整记录所有变更
         """
         audit_log = []
+        # 同一批操作共用一个记录时间，断言只依赖结构
+        logged_at = datetime.now()
         
         for op in operations:
             # 记录审计日志
@@ -768,7 +780,7 @@ class TestAuditTrailProperties:
                 "operation_type": op["type"],
                 "entity_id": op["entity_id"],
                 "timestamp": op["timestamp"],
-                "logged_at": datetime.now()
+                "logged_at": logged_at
             }
             audit_log.append(audit_entry)
         
@@ -800,55 +812,42 @@ class TestAuditTrailProperties:
         
         对于任意好感度变化序列，历史记录必须能够重建完整的变化轨迹
         """
-        # 模拟好感度历史
-        history = []
-        current_score = 0.0
-        
-        for i, delta in enumerate(affinity_changes):
-            old_score = current_score
-            new_score = max(-1.0, min(1.0, current_score + delta))
-            
-            history.append({
-                "sequence": i,
-                "old_score": old_score,
-                "new_score": new_score,
-                "delta": new_score - old_score,
-                "timestamp": datetime.now()
-            })
-            
-            current_score = new_score
+        # 模拟好感度历史（列式：下标即 sequence）
+        old_scores, new_scores, deltas = _scan_affinity(affinity_changes)
+        current_score = float(new_scores[-1])
         
         # 验证可追溯性
         # 1. 历史记录完整
-        assert len(history) == len(affinity_changes)
+        assert len(new_scores) == len(affinity_changes)
         
-        # 2. 可以从历史重建当前状态
-        reconstructed_score = 0.0
-        for entry in history:
-            reconstructed_score = entry["new_score"]
-        
-        assert abs(reconstructed_score - current_score) < 1e-6, \
+        # 2. 可以从历史重建当前状态，且每条记录的 old 衔接上一条的 new
+        assert abs(deltas.sum() - current_score) < 1e-6, \
             "Should be able to reconstruct current score from history"
+        assert old_scores[0] == 0.0
+        assert np.array_equal(old_scores[1:], new_scores[:-1]), \
+            "Each entry should start from the previous entry's score"
         
         # 3. 每条记录的 delta 正确
-        for entry in history:
-            expected_delta = entry["new_score"] - entry["old_score"]
-            assert abs(entry["delta"] - expected_delta) < 1e-6, \
-                "Delta should equal new_score - old_score"
+        assert np.allclose(deltas, new_scores - old_scores, atol=1e-6), \
+            "Delta should equal new_score - old_score"
 
 
 # 导入 uuid 用于测试
 import uuid
 
+# 生成结果中与输入无关的固定字段
+_GENERATION_RESULT_TEMPLATE = {"reply": "这是一个测试回复"}
+_GENERATION_METADATA_TEMPLATE = {"response_time_ms": 150.5}
+
 
 class TestGenerationProperties:
     """生成结果属性测试"""
     
     @given(
-        affinity_score=st.floats(min_value=-1.0, max_value=1.0),
-        emotion_valence=st.floats(min_value=-1.0, max_value=1.0),
+        affinity_score=_UNIT,
+        emotion_valence=_UNIT,
         memory_count=st.integers(min_value=0, max_value=10),
-        tier=st.sampled_from(["tier0", "tier1", "tier2"])
+        tier=st.sampled_from(_TIERS)
     )
     @hypothesis_settings(max_examples=50)
     def test_generation_metadata_property6(
@@ -868,23 +867,24 @@ class TestGenerationProperties:
         - 使用的模型 Tier
         - 响应时间
         """
-        # 模拟生成结果
-        generation_result = {
-            "reply": "这是一个测试回复",
-            "session_id": str(uuid.uuid4()),
-            "turn_id": str(uuid.uuid4()),
-            "metadata": {
-                "memories_used": [str(uuid.uuid4()) for _ in range(memory_count)],
-                "affinity_score": affinity_score,
-                "affinity_state": _calculate_state(affinity_score),
-                "emotion": {
-                    "valence": emotion_valence,
-                    "primary_emotion": "happy" if emotion_valence > 0 else "sad"
-                },
-                "tier": tier,
-                "response_time_ms": 150.5
-            }
-        }
+        # 模拟生成结果（固定字段来自模板，只填充每个示例不同的部分）
+        metadata = dict(_GENERATION_METADATA_TEMPLATE)
+        metadata.update(
+            memories_used=[uuid.uuid4().hex for _ in range(memory_count)],
+            affinity_score=affinity_score,
+            affinity_state=_calculate_state(affinity_score),
+            emotion={
+                "valence": emotion_valence,
+                "primary_emotion": "happy" if emotion_valence > 0 else "sad"
+            },
+            tier=tier,
+        )
+        generation_result = dict(_GENERATION_RESULT_TEMPLATE)
+        generation_result.update(
+            session_id=uuid.uuid4().hex,
+            turn_id=uuid.uuid4().hex,
+            metadata=metadata,
+        )
         
         # 验证必要字段存在
         assert "reply" in generation_result
@@ -903,15 +903,13 @@ class TestGenerationProperties:
         assert -1.0 <= metadata["affinity_score"] <= 1.0
         
         assert "affinity_state" in metadata
-        assert metadata["affinity_state"] in [
-            "stranger", "acquaintance", "friend", "close_friend", "best_friend"
-        ]
+        assert metadata["affinity_state"] in _STATE_SET
         
         assert "emotion" in metadata
         assert "valence" in metadata["emotion"]
         
         assert "tier" in metadata
-        assert metadata["tier"] in ["tier0", "tier1", "tier2"]
+        assert metadata["tier"] in _TIER_SET
         
         assert "response_time_ms" in metadata
         assert metadata["response_time_ms"] >= 0
@@ -919,13 +917,4 @@ class TestGenerationProperties:
 
 def _calculate_state(score: float) -> str:
     """计算好感度状态"""
-    if score < 0:
-        return "stranger"
-    elif score < 0.3:
-        return "acquaintance"
-    elif score < 0.5:
-        return "friend"
-    elif score < 0.7:
-        return "close_friend"
-    else:
-        return "best_friend"
+    return _STATES[bisect_right(_STATE_BOUNDS, score)]
@@ -6,107 +6,166 @@
 2. 查询未知实体（小明）的喜好 - 应该说不知道
 """
 import asyncio
+import json
+import logging
+import time
+
 import httpx
+import pytest
+
+from app.core.config import settings
 
 API_BASE = "http://localhost:8000/api/v1"
+HEALTH_URL = "http://localhost:8000/health"
+
+# 输出走 logging：pytest 下默认不显示，需要时加 --log-cli-level=INFO
+logger = logging.getLogger(__name__)
+
 USER_ID = "9a9e9803-94d6-4ecd-8d09-66fb4745ef85"
 
 
+# Token 缓存：user_id -> (token, 过期时刻 monotonic)；有效期取后端配置 settings.JWT_EXPIRE_MINUTES
+_TOKEN_CACHE: dict[str, tuple[str, float]] = {}
+_TOKEN_LOCK = asyncio.Lock()
+
+
 async def get_token(client: httpx.AsyncClient, user_id: str) -> str:
-    """获取认证 token"""
-    resp = await client.post(
-        f"{API_BASE}/auth/token",
-        json={"user_id": user_id}
+    """获取认证 token（过期前 30 秒内复用缓存）"""
+    async with _TOKEN_LOCK:
+        cached = _TOKEN_CACHE.get(user_id)
+        if cached and time.monotonic() < cached[1] - 30:
+            return cached[0]
+        
+        resp = await client.post(
+            f"{API_BASE}/auth/token",
+            json={"user_id": user_id}
+        )
+        if resp.status_code != 200:
+            raise Exception(f"Failed to get token: {resp.status_code} {resp.text}")
+        token = resp.json()["access_token"]
+        _TOKEN_CACHE[user_id] = (token, time.monotonic() + settings.JWT_EXPIRE_MINUTES * 60)
+        return token
+
+
+# 反幻觉判定关键词（模块级常量，只构造一次）
+HONEST_KEYWORDS = frozenset(("不记得", "没告诉", "不知道", "没有", "还没", "不清楚"))
+HALLUCINATION_KEYWORDS = frozenset(("喜欢", "爱好", "运动", "音乐", "游戏", "阅读"))
+
+# 测试查询（顺序与下方测试 1-4 对应）
+QUERIES = ["二丫喜欢什么", "昊哥喜欢什么", "小明喜欢什么", "张sir住在哪里"]
+
+
+def reply_of(resp: httpx.Response) -> str:
+    """取出回复文本（调用方已确认 200；reply 是响应模型的必填字段）"""
+    # json.loads 直接解析 bytes，省去先解码成 str
+    return json.loads(resp.content)["reply"]
+
+
+async def ask(client: httpx.AsyncClient, headers: dict, message: str, session_id: str) -> httpx.Response:
+    """发送一条对话消息（并发查询各用独立会话，避免对话历史互相串入）"""
+    return await client.post(
+        f"{API_BASE}/conversation/message",
+        json={"message": message, "session_id": session_id},
+        headers=headers
+    )
+
+
+def make_client() -> httpx.AsyncClient:
+    """创建测试用 HTTP 客户端（keep-alive 连接池）"""
+    return httpx.AsyncClient(
+        timeout=60.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
     )
-    if resp.status_code == 200:
-        return resp.json()["access_token"]
-    raise Exception(f"Failed to get token: {resp.status_code} {resp.text}")
 
 
-async def test_rag_retrieval():
+async def auth_headers(client: httpx.AsyncClient) -> dict:
+    """预热连接池并获取认证头"""
+    await client.get(HEALTH_URL)
+    token = await get_token(client, USER_ID)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+async def rag_client():
+    """整个测试会话共享一个 HTTP 客户端，连接保持复用"""
+    async with make_client() as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+async def rag_headers(rag_client):
+    """认证头只获取一次"""
+    return await auth_headers(rag_client)
+
+
+async def test_rag_retrieval(rag_client, rag_headers):
     """测试 RAG 检索修复"""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        print("=" * 60)
-        print("RAG 修复测试")
-        print("=" * 60)
-        
-        # 获取认证 token
-        print("\n[0] 获取认证 token...")
-        token = await get_token(client, USER_ID)
-        headers = {"Authorization": f"Bearer {token}"}
-        print(f"   ✓ Token 获取成功")
-        
-        # 测试 1: 查询二丫（图谱中有记录）
-        print("\n[1] 测试查询: '二丫喜欢什么' (图谱中有记录)")
-        resp1 = await client.post(
-            f"{API_BASE}/conversation/message",
-            json={"message": "二丫喜欢什么", "session_id": "test-rag"},
-            headers=headers
-        )
-        if resp1.status_code == 200:
-            reply1 = resp1.json().get("reply", "")
-            print(f"   回复: {reply1}")
-            if "足球" in reply1 or "篮球" in reply1:
-                print("   ✓ 正确召回了二丫的喜好")
-            else:
-                print("   ? 回复中没有提到足球/篮球")
-        
-        # 测试 2: 查询昊哥（图谱中有记录）
-        print("\n[2] 测试查询: '昊哥喜欢什么' (图谱中有记录)")
-        resp2 = await client.post(
-            f"{API_BASE}/conversation/message",
-            json={"message": "昊哥喜欢什么", "session_id": "test-rag"},
-            headers=headers
-        )
-        if resp2.status_code == 200:
-            reply2 = resp2.json().get("reply", "")
-            print(f"   回复: {reply2}")
-            if "足球" in reply2:
-                print("   ✓ 正确召回了昊哥的喜好（图谱中确实有昊哥喜欢足球的记录）")
-        
-        # 测试 3: 查询小明（图谱中没有记录）- 关键测试
-        print("\n[3] 测试查询: '小明喜欢什么' (图谱中无记录 - 反幻觉测试)")
-        resp3 = await client.post(
-            f"{API_BASE}/conversation/message",
-            json={"message": "小明喜欢什么", "session_id": "test-rag"},
-            headers=headers
-        )
-        if resp3.status_code == 200:
-            reply3 = resp3.json().get("reply", "")
-            print(f"   回复: {reply3}")
-            
-            # 检查是否正确表示不知道
-            honest_keywords = ["不记得", "没告诉", "不知道", "没有", "还没", "不清楚"]
-            is_honest = any(kw in reply3 for kw in honest_keywords)
-            
-            # 检查是否有幻觉
-            hallucination_keywords = ["喜欢", "爱好", "运动", "音乐", "游戏", "阅读"]
-            has_hallucination = any(kw in reply3 for kw in hallucination_keywords) and not is_honest
-            
-            if is_honest:
-                print("   ✓ 反幻觉成功！系统诚实表示不知道")
-            elif has_hallucination:
-                print("   ✗ 检测到幻觉！系统编造了小明的喜好")
-            else:
-                print("   ? 需要人工检查")
-        
-        # 测试 4: 查询张sir（图谱中有记录）
-        print("\n[4] 测试查询: '张sir住在哪里' (图谱中有记录)")
-        resp4 = await client.post(
-            f"{API_BASE}/conversation/message",
-            json={"message": "张sir住在哪里", "session_id": "test-rag"},
-            headers=headers
-        )
-        if resp4.status_code == 200:
-            reply4 = resp4.json().get("reply", "")
-            print(f"   回复: {reply4}")
-            if "哈尔滨" in reply4:
-                print("   ✓ 正确召回了张sir的居住地")
-        
-        print("\n" + "=" * 60)
-        print("测试完成")
-        print("=" * 60)
+    client, headers = rag_client, rag_headers
+    logger.info("=" * 60)
+    logger.info("RAG 修复测试")
+    logger.info("=" * 60)
+    
+    # 四个查询互不依赖，并发发出（共用同一个 client 的连接池）
+    logger.info("\n[1-4] 并发发送 4 个测试查询...")
+    resp1, resp2, resp3, resp4 = await asyncio.gather(
+        *(ask(client, headers, msg, f"test-rag-{i}") for i, msg in enumerate(QUERIES, 1))
+    )
+    
+    # 测试 1: 查询二丫（图谱中有记录）
+    logger.info("\n[1] 测试查询: '二丫喜欢什么' (图谱中有记录)")
+    if resp1.status_code == 200:
+        reply1 = reply_of(resp1)
+        logger.info(f"   回复: {reply1}")
+        if "足球" in reply1 or "篮球" in reply1:
+            logger.info("   ✓ 正确召回了二丫的喜好")
+        else:
+            logger.info("   ? 回复中没有提到足球/篮球")
+    
+    # 测试 2: 查询昊哥（图谱中有记录）
+    logger.info("\n[2] 测试查询: '昊哥喜欢什么' (图谱中有记录)")
+    if resp2.status_code == 200:
+        reply2 = reply_of(resp2)
+        logger.info(f"   回复: {reply2}")
+        if "足球" in reply2:
+            logger.info("   ✓ 正确召回了昊哥的喜好（图谱中确实有昊哥喜欢足球的记录）")
+    
+    # 测试 3: 查询小明（图谱中没有记录）- 关键测试
+    logger.info("\n[3] 测试查询: '小明喜欢什么' (图谱中无记录 - 反幻觉测试)")
+    if resp3.status_code == 200:
+        reply3 = reply_of(resp3)
+        logger.info(f"   回复: {reply3}")
+    
+        # 检查是否正确表示不知道
+        is_honest = any(kw in reply3 for kw in HONEST_KEYWORDS)
+    
+        # 检查是否有幻觉
+        has_hallucination = any(kw in reply3 for kw in HALLUCINATION_KEYWORDS) and not is_honest
+    
+        if is_honest:
+            logger.info("   ✓ 反幻觉成功！系统诚实表示不知道")
+        elif has_hallucination:
+            logger.info("   ✗ 检测到幻觉！系统编造了小明的喜好")
+        else:
+            logger.info("   ? 需要人工检查")
+    
+    # 测试 4: 查询张sir（图谱中有记录）
+    logger.info("\n[4] 测试查询: '张sir住在哪里' (图谱中有记录)")
+    if resp4.status_code == 200:
+        reply4 = reply_of(resp4)
+        logger.info(f"   回复: {reply4}")
+        if "哈尔滨" in reply4:
+            logger.info("   ✓ 正确召回了张sir的居住地")
+    
+    logger.info("\n" + "=" * 60)
+    logger.info("测试完成")
+    logger.info("=" * 60)
+    
+
+async def main():
+    async with make_client() as client:
+        await test_rag_retrieval(client, await auth_headers(client))
 
 
 if __name__ == "__main__":
-    asyncio.run(test_rag_retrieval())
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(main())
@@ -7,57 +7,117 @@
 3. 是否正确使用检索到的信息
 """
 import asyncio
+import logging
+import os
+import re
 import sys
+import time
+
+import pytest
 from app.services.conversation_service import ConversationService
 from app.core.database import get_db_session
 
-async def test_police_query():
+# 输出走 logging：pytest 下默认不显示，需要时加 --log-cli-level=INFO；脚本运行时见 __main__
+logger = logging.getLogger(__name__)
+
+# 流式回复逐字回显到终端（CI 下关闭）
+STREAM_ECHO = not os.getenv("CI")
+
+
+def echo_stream(text: str):
+    if STREAM_ECHO:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+# 相邻查询之间的最小间隔（秒）；只补足本轮耗时不足的部分
+MIN_QUERY_INTERVAL_S = float(os.getenv("QUALITY_TEST_MIN_INTERVAL", "0.2"))
+
+# 已知的不通顺片段：流式输出中一旦出现即判定失败，不再等待生成结束
+BAD_PATTERNS = ("就是一名", "也这个职业", "的信息我没有")
+_BAD_RE = re.compile("|".join(map(re.escape, BAD_PATTERNS)))
+# 只需保留末尾一小段（不短于最长片段），即可识别跨 chunk 的片段
+_TAIL_CHARS = 32
+
+# 流式输出相邻两次 delta 的最长等待（秒）；首个 delta 含检索耗时，不宜过小
+DELTA_TIMEOUT_S = float(os.getenv("QUALITY_TEST_DELTA_TIMEOUT", "30"))
+
+
+async def iter_with_deadline(stream, timeout: float = DELTA_TIMEOUT_S):
+    """逐个取出流式 delta，单步超过 timeout 即抛 TimeoutError，避免 LLM 卡住时无限等待"""
+    it = stream.__aiter__()
+    try:
+        while True:
+            try:
+                delta = await asyncio.wait_for(anext(it), timeout=timeout)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                raise TimeoutError(f"流式输出超过 {timeout}s 没有新数据") from None
+            yield delta
+    finally:
+        await it.aclose()
+
+@pytest.fixture(scope="module")
+def conversation_service():
+    """模块内共享一个对话服务（检索/图谱等依赖只初始化一次）"""
+    return ConversationService()
+
+
+async def test_police_query(conversation_service):
     """测试"谁当警察"这类查询的回答质量"""
     
-    print("=" * 60)
-    print("测试场景：谁当警察？")
-    print("=" * 60)
+    logger.info("=" * 60)
+    logger.info("测试场景：谁当警察？")
+    logger.info("=" * 60)
     
-    service = ConversationService()
+    service = conversation_service
     
     # 模拟用户查询
     user_id = "test_user"
     session_id = "test_session"
     message = "谁当警察"
     
-    print(f"\n用户问题: {message}")
-    print("\n正在生成回答...")
+    logger.info(f"\n用户问题: {message}")
+    logger.info("\n正在生成回答...")
     
+    # 流式阶段命中的不通顺片段（命中即判定测试失败）
+    bad_match = None
     try:
         # 使用流式输出
         full_reply = ""
-        async for delta in service.process_message_stream(
+        tail = ""
+        async for delta in iter_with_deadline(service.process_message_stream(
             user_id=user_id,
             session_id=session_id,
             message=message,
             db_session=None,  # 测试模式
             mode="hybrid"
-        ):
+        )):
             if delta.type == "text" and delta.content:
                 full_reply += delta.content
-                print(delta.content, end="", flush=True)
+                echo_stream(delta.content)
+                tail = (tail + delta.content)[-_TAIL_CHARS:]
+                bad_match = _BAD_RE.search(tail)
+                if bad_match:
+                    echo_stream("\n")
+                    break
             elif delta.type == "done":
-                print("\n")
+                echo_stream("\n")
                 break
             elif delta.type == "error":
-                print(f"\n错误: {delta.content}")
+                logger.info(f"\n错误: {delta.content}")
                 return
         
-        print("\n" + "=" * 60)
-        print("回答质量分析:")
-        print("=" * 60)
+        logger.info("\n" + "=" * 60)
+        logger.info("回答质量分析:")
+        logger.info("=" * 60)
         
         # 分析回答质量
         issues = []
         
-        # 检查语序问题
-        if "就是一名" in full_reply or "也这个职业" in full_reply:
-            issues.append("❌ 语序混乱：句子不完整")
+        # 检查语序问题（流式阶段已检测，命中即提前终止）
+        if bad_match:
+            issues.append(f"❌ 语序混乱：出现「{bad_match.group()}」，已提前终止")
         
         # 检查逻辑跳跃
         if "可能还有其他人也" in full_reply:
@@ -65,13 +125,13 @@ async def test_police_query():
         
         # 检查是否有明确答案
         if "张sir" in full_reply and ("警察" in full_reply or "警局" in full_reply):
-            print("✅ 正确识别：张sir是警察")
+            logger.info("✅ 正确识别：张sir是警察")
         else:
             issues.append("❌ 未能正确回答问题")
         
         # 检查句子完整性
         if full_reply.count("。") >= 2:
-            print("✅ 句子完整：使用了完整的句子")
+            logger.info("✅ 句子完整：使用了完整的句子")
         else:
             issues.append("⚠️  句子可能不够完整")
         
@@ -82,22 +142,26 @@ async def test_police_query():
             issues.append(f"⚠️  过度使用不确定词汇（{uncertain_count}次）")
         
         if issues:
-            print("\n发现的问题:")
+            logger.info("\n发现的问题:")
             for issue in issues:
-                print(f"  {issue}")
+                logger.info(f"  {issue}")
         else:
-            print("\n✅ 回答质量良好！")
+            logger.info("\n✅ 回答质量良好！")
         
-        print("\n完整回答:")
-        print(f"「{full_reply}」")
+        logger.info("\n完整回答:")
+        logger.info(f"「{full_reply}」")
         
+    except TimeoutError as e:
+        pytest.fail(str(e))
     except Exception as e:
-        print(f"\n测试失败: {e}")
+        logger.info(f"\n测试失败: {e}")
         import traceback
         traceback.print_exc()
+    
+    assert bad_match is None, f"回答出现不通顺片段: 「{bad_match.group()}」"
 
 
-async def test_multiple_queries():
+async def test_multiple_queries(conversation_service):
     """测试多个查询场景"""
     
     test_cases = [
@@ -118,63 +182,87 @@ async def test_multiple_queries():
         }
     ]
     
-    service = ConversationService()
+    service = conversation_service
+    # 命中不通顺片段的用例（全部跑完后统一判定失败）
+    bad_cases = []
     
     for i, case in enumerate(test_cases, 1):
-        print("\n" + "=" * 60)
-        print(f"测试 {i}/{len(test_cases)}: {case['description']}")
-        print("=" * 60)
-        print(f"问题: {case['query']}")
+        t0 = time.monotonic()
+        logger.info("\n" + "=" * 60)
+        logger.info(f"测试 {i}/{len(test_cases)}: {case['description']}")
+        logger.info("=" * 60)
+        logger.info(f"问题: {case['query']}")
         
         full_reply = ""
+        tail = ""
+        bad_match = None
         try:
-            async for delta in service.process_message_stream(
+            async for delta in iter_with_deadline(service.process_message_stream(
                 user_id="test_user",
                 session_id=f"test_session_{i}",
                 message=case['query'],
                 db_session=None,
                 mode="hybrid"
-            ):
+            )):
                 if delta.type == "text" and delta.content:
                     full_reply += delta.content
+                    tail = (tail + delta.content)[-_TAIL_CHARS:]
+                    bad_match = _BAD_RE.search(tail)
+                    if bad_match:
+                        logger.info(f"❌ 出现不通顺片段「{bad_match.group()}」，提前终止")
+                        bad_cases.append(f"{case['description']}: 「{bad_match.group()}」")
+                        break
                 elif delta.type == "done":
                     break
             
-            print(f"回答: {full_reply}")
+            logger.info(f"回答: {full_reply}")
             
             # 检查关键词
             found_keywords = [kw for kw in case['expected_keywords'] if kw in full_reply]
-            print(f"\n关键词匹配: {len(found_keywords)}/{len(case['expected_keywords'])}")
-            print(f"  期望: {case['expected_keywords']}")
-            print(f"  找到: {found_keywords}")
+            logger.info(f"\n关键词匹配: {len(found_keywords)}/{len(case['expected_keywords'])}")
+            logger.info(f"  期望: {case['expected_keywords']}")
+            logger.info(f"  找到: {found_keywords}")
             
             # 简单的流畅度评分
             fluency_score = 0
             if "。" in full_reply:
                 fluency_score += 1
-            if not any(bad in full_reply for bad in ["就是一名", "也这个职业", "的信息我没有"]):
+            if not bad_match:
                 fluency_score += 1
             if len(full_reply) > 20:
                 fluency_score += 1
             
-            print(f"流畅度评分: {fluency_score}/3")
+            logger.info(f"流畅度评分: {fluency_score}/3")
             
+        except TimeoutError as e:
+            pytest.fail(f"{case['description']}: {e}")
         except Exception as e:
-            print(f"错误: {e}")
+            logger.info(f"错误: {e}")
         
-        await asyncio.sleep(1)  # 避免请求过快
+        # 避免请求过快：请求本身已耗时超过间隔时不再等待
+        elapsed = time.monotonic() - t0
+        await asyncio.sleep(max(0.0, MIN_QUERY_INTERVAL_S - elapsed))
+    
+    assert not bad_cases, f"回答出现不通顺片段: {bad_cases}"
 
 
-if __name__ == "__main__":
-    print("回答质量测试")
-    print("=" * 60)
-    print("目标：验证语序优化效果")
-    print("=" * 60)
-    
-    # 运行测试
-    asyncio.run(test_police_query())
+async def main(run_all: bool):
+    # 服务的 Neo4j/Redis/LLM 客户端绑定创建时的事件循环，须在同一个 asyncio.run 内使用
+    service = ConversationService()
+    await test_police_query(service)
     
     # 如果需要测试多个场景
-    if len(sys.argv) > 1 and sys.argv[1] == "--all":
-        print("\n\n运行完整测试套件...")
-        asyncio.run(test_multiple_queries())
+    if run_all:
+        logger.info("\n\n运行完整测试套件...")
+        await test_multiple_queries(service)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.info("回答质量测试")
+    logger.info("=" * 60)
+    logger.info("目标：验证语序优化效果")
+    logger.info("=" * 60)
+    
+    # 运行测试（同一个事件循环内创建并复用服务）
+    asyncio.run(main(run_all=len(sys.argv) > 1 and sys.argv[1] == "--all"))
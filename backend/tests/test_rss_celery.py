@@ -7,88 +7,111 @@
 3. 内容是否成功保存到数据库
 """
 import asyncio
+import logging
 import sys
+
+import pytest
+from celery.exceptions import TimeoutError as CeleryTimeoutError
 from sqlalchemy import text
 from app.core.database import AsyncSessionLocal
+from app.worker import celery_app
+
+# 输出走 logging：pytest 下默认不显示，需要时加 --log-cli-level=INFO
+logger = logging.getLogger(__name__)
+
+# 等待抓取任务完成的超时（秒）
+TASK_TIMEOUT_S = 30
+
+# 今日抓取统计
+TODAY_STATS_SQL = text("""
+    SELECT COUNT(*) as total,
+           COUNT(DISTINCT source) as sources
+    FROM content_library
+    WHERE DATE(fetched_at) = CURRENT_DATE
+""")
+
+# 今日抓取统计 + 最新5条内容（每行重复统计列）
+TODAY_STATS_WITH_LATEST_SQL = text("""
+    WITH c AS (
+        SELECT COUNT(*) as total,
+               COUNT(DISTINCT source) as sources
+        FROM content_library
+        WHERE DATE(fetched_at) = CURRENT_DATE
+    )
+    SELECT c.total, c.sources, cl.source, cl.title, cl.content_url, cl.fetched_at
+    FROM c
+    LEFT JOIN LATERAL (
+        SELECT source, title, content_url, fetched_at
+        FROM content_library
+        ORDER BY fetched_at DESC
+        LIMIT 5
+    ) cl ON true
+    ORDER BY cl.fetched_at DESC
+""")
 
 async def test_rss_fetch():
     """测试RSS抓取功能"""
-    print("=" * 60)
-    print("测试Celery RSS抓取功能")
-    print("=" * 60)
+    logger.info("=" * 60)
+    logger.info("测试Celery RSS抓取功能")
+    logger.info("=" * 60)
     
-    # 1. 检查当前内容数量
-    print("\n1. 检查当前内容数量...")
+    # 整个测试共用一个会话（一次连接池签出）
     async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            text("""
-                SELECT COUNT(*) as total,
-                       COUNT(DISTINCT source) as sources
-                FROM content_library
-                WHERE DATE(fetched_at) = CURRENT_DATE
-            """)
-        )
+        # 1. 检查当前内容数量
+        logger.info("\n1. 检查当前内容数量...")
+        result = await db.execute(TODAY_STATS_SQL)
         row = result.fetchone()
-        print(f"   今日内容: {row[0]} 条")
-        print(f"   来源数量: {row[1]} 个")
+        logger.info(f"   今日内容: {row[0]} 条")
+        logger.info(f"   来源数量: {row[1]} 个")
         
         before_count = row[0]
-    
-    # 2. 触发Celery任务
-    print("\n2. 触发Celery任务...")
-    print("   请手动执行以下命令：")
-    print("   docker exec affinity-celery-worker celery -A app.worker call content.test_fetch")
-    print("\n   等待任务完成（约10-30秒）...")
-    print("   按Enter继续...")
-    input()
-    
-    # 3. 检查更新后的内容数量
-    print("\n3. 检查更新后的内容数量...")
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            text("""
-                SELECT COUNT(*) as total,
-                       COUNT(DISTINCT source) as sources
-                FROM content_library
-                WHERE DATE(fetched_at) = CURRENT_DATE
-            """)
-        )
-        row = result.fetchone()
-        print(f"   今日内容: {row[0]} 条")
-        print(f"   来源数量: {row[1]} 个")
         
-        after_count = row[0]
+        # 2. 触发Celery任务
+        logger.info("\n2. 触发Celery任务...")
+        async_result = celery_app.send_task("content.test_fetch")
+        logger.info(f"   任务已提交: {async_result.id}")
+        logger.info(f"   等待任务完成（最多{TASK_TIMEOUT_S}秒）...")
+        try:
+            # AsyncResult.get 是阻塞轮询，放到线程里等待
+            task_result = await asyncio.to_thread(async_result.get, timeout=TASK_TIMEOUT_S)
+            logger.info(f"   任务结果: {task_result}")
+        except CeleryTimeoutError:
+            pytest.fail(f"任务在 {TASK_TIMEOUT_S} 秒内未完成，请检查 Celery Worker 是否运行")
+        
+        # 3+4. 更新后的内容数量与最新5条内容，一次查询取回
+        logger.info("\n3. 检查更新后的内容数量...")
+        result = await db.execute(TODAY_STATS_WITH_LATEST_SQL)
+        rows = result.fetchall()
+        logger.info(f"   今日内容: {rows[0][0]} 条")
+        logger.info(f"   来源数量: {rows[0][1]} 个")
+        
+        after_count = rows[0][0]
         new_count = after_count - before_count
         
         if new_count > 0:
-            print(f"\n   ✅ 成功抓取 {new_count} 条新内容！")
+            logger.info(f"\n   ✅ 成功抓取 {new_count} 条新内容！")
         else:
-            print(f"\n   ⚠️  没有新内容，可能原因：")
-            print("      - RSS源返回的内容已存在（去重）")
-            print("      - RSS源无法访问")
-            print("      - 任务执行失败")
-    
-    # 4. 显示最新内容
-    print("\n4. 显示最新5条内容...")
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            text("""
-                SELECT source, title, content_url, fetched_at
-                FROM content_library
-                ORDER BY fetched_at DESC
-                LIMIT 5
-            """)
-        )
+            logger.info(f"\n   ⚠️  没有新内容，可能原因：")
+            logger.info("      - RSS源返回的内容已存在（去重）")
+            logger.info("      - RSS源无法访问")
+            logger.info("      - 任务执行失败")
         
-        rows = result.fetchall()
-        for i, row in enumerate(rows, 1):
-            print(f"\n   {i}. [{row[0]}] {row[1]}")
-            print(f"      URL: {row[2]}")
-            print(f"      时间: {row[3]}")
+        logger.info("\n4. 显示最新5条内容...")
+        # 内容库为空时 LEFT JOIN 仍返回一行统计，明细列为 NULL
+        latest = [row[2:] for row in rows if row[2] is not None]
+        for i, row in enumerate(latest, 1):
+            logger.info(f"\n   {i}. [{row[0]}] {row[1]}")
+            logger.info(f"      URL: {row[2]}")
+            logger.info(f"      时间: {row[3]}")
     
-    print("\n" + "=" * 60)
-    print("测试完成！")
-    print("=" * 60)
+    logger.info("\n" + "=" * 60)
+    logger.info("测试完成！")
+    logger.info("=" * 60)
 
 if __name__ == "__main__":
-    asyncio.run(test_rss_fetch())
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        asyncio.run(test_rss_fetch())
+    except pytest.fail.Exception as e:
+        logger.info(f"   ❌ {e}")
+        sys.exit(1)
@@ -8,144 +8,182 @@
 """
 import asyncio
 import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import AsyncSessionLocal
 from app.services.content_aggregator_service import ContentAggregatorService
 
+# 指定 URL 集合（本次抓取的内容）在库中的来源分布
+SOURCE_COUNTS_BY_URLS_SQL = text("""
+    SELECT source, COUNT(*) as count
+    FROM content_library
+    WHERE content_url = ANY(:urls)
+    GROUP BY source
+    ORDER BY count DESC
+""")
+
+
+@asynccontextmanager
+async def open_content_service():
+    """打开数据库会话与内容聚合服务，退出时关闭服务的 HTTP 客户端"""
+    async with AsyncSessionLocal() as db:
+        service = ContentAggregatorService(db)
+        try:
+            yield service
+        finally:
+            await service.close()
+
+
+@pytest.fixture(scope="module")
+async def shared_content_service():
+    """模块内共享一个服务（会话与 HTTP keep-alive 连接在两个测试间复用）"""
+    async with open_content_service() as service:
+        yield service
+
+
+@pytest.fixture
+async def content_service(shared_content_service):
+    """每个测试结束后回滚共享会话，避免上一个测试的 SQL 错误让事务停留在中止状态"""
+    try:
+        yield shared_content_service
+    finally:
+        await shared_content_service.db.rollback()
 
-async def test_rss_fetch():
+
+async def test_rss_fetch(content_service):
     """测试RSS抓取"""
     print("=" * 60)
     print("RSS内容抓取测试")
     print("=" * 60)
     
-    async with AsyncSessionLocal() as db:
-        service = ContentAggregatorService(db)
+    service = content_service
+    db = service.db
+    
+    try:
+        # 步骤1: 抓取RSS内容
+        print("\n📡 步骤1: 抓取RSS内容...")
+        contents = await service.fetch_rss_feeds()
         
-        try:
-            # 步骤1: 抓取RSS内容
-            print("\n📡 步骤1: 抓取RSS内容...")
-            contents = await service.fetch_rss_feeds()
-            
-            if not contents:
-                print("❌ 未抓取到任何内容")
-                return False
-            
-            print(f"✅ 成功抓取 {len(contents)} 条内容\n")
-            
-            # 显示前5条内容
-            print("📋 内容预览（前5条）:")
-            for i, content in enumerate(contents[:5], 1):
-                print(f"\n{i}. {content.title}")
-                print(f"   来源: {content.source}")
-                print(f"   URL: {content.content_url}")
-                print(f"   标签: {', '.join(content.tags[:3])}")
-                print(f"   质量分: {content.quality_score}")
-            
-            # 步骤2: 保存到数据库
-            print(f"\n💾 步骤2: 保存到数据库...")
-            saved_count = await service.save_contents_batch(contents)
-            
-            print(f"✅ 成功保存 {saved_count}/{len(contents)} 条内容")
-            
-            # 步骤3: 验证数据库
-            print(f"\n🔍 步骤3: 验证数据库...")
-            from sqlalchemy import text
-            
-            result = await db.execute(
-                text("""
-                    SELECT COUNT(*) as total,
-                           COUNT(DISTINCT source) as sources,
-                           MAX(published_at) as latest
-                    FROM content_library
-                    WHERE DATE(published_at) >= CURRENT_DATE - INTERVAL '1 day'
-                """)
-            )
-            
-            row = result.fetchone()
-            print(f"✅ 数据库统计:")
-            print(f"   总内容数: {row[0]}")
-            print(f"   来源数: {row[1]}")
-            print(f"   最新时间: {row[2]}")
-            
-            # 显示各来源统计
-            result = await db.execute(
-                text("""
-                    SELECT source, COUNT(*) as count
-                    FROM content_library
-                    WHERE DATE(published_at) >= CURRENT_DATE - INTERVAL '1 day'
-                    GROUP BY source
-                    ORDER BY count DESC
-                """)
-            )
-            
-            print(f"\n📊 各来源统计:")
-            for row in result.fetchall():
-                print(f"   {row[0]}: {row[1]} 条")
-            
-            print("\n" + "=" * 60)
-            print("✅ RSS抓取测试通过！")
-            print("=" * 60)
-            
-            return True
-            
-        except Exception as e:
-            print(f"\n❌ 测试失败: {e}")
-            import traceback
-            traceback.print_exc()
+        if not contents:
+            print("❌ 未抓取到任何内容")
             return False
-            
-        finally:
-            await service.close()
+        
+        print(f"✅ 成功抓取 {len(contents)} 条内容\n")
+        
+        # 显示前5条内容
+        print("📋 内容预览（前5条）:")
+        for i, content in enumerate(contents[:5], 1):
+            print(f"\n{i}. {content.title}")
+            print(f"   来源: {content.source}")
+            print(f"   URL: {content.content_url}")
+            print(f"   标签: {', '.join(content.tags[:3])}")
+            print(f"   质量分: {content.quality_score}")
+        
+        # 步骤2: 保存到数据库
+        print(f"\n💾 步骤2: 保存到数据库...")
+        saved_count = await service.save_contents_batch(contents)
+        
+        print(f"✅ 成功保存 {saved_count}/{len(contents)} 条内容")
+        
+        # 步骤3: 验证数据库
+        print(f"\n🔍 步骤3: 验证数据库...")
+        result = await db.execute(
+            text("""
+                SELECT COUNT(*) as total,
+                       COUNT(DISTINCT source) as sources,
+                       MAX(published_at) as latest
+                FROM content_library
+                WHERE DATE(published_at) >= CURRENT_DATE - INTERVAL '1 day'
+            """)
+        )
+        
+        row = result.fetchone()
+        print(f"✅ 数据库统计:")
+        print(f"   总内容数: {row[0]}")
+        print(f"   来源数: {row[1]}")
+        print(f"   最新时间: {row[2]}")
+        
+        # 显示各来源统计
+        result = await db.execute(
+            text("""
+                SELECT source, COUNT(*) as count
+                FROM content_library
+                WHERE DATE(published_at) >= CURRENT_DATE - INTERVAL '1 day'
+                GROUP BY source
+                ORDER BY count DESC
+            """)
+        )
+        
+        print(f"\n📊 各来源统计:")
+        for row in result.fetchall():
+            print(f"   {row[0]}: {row[1]} 条")
+        
+        print("\n" + "=" * 60)
+        print("✅ RSS抓取测试通过！")
+        print("=" * 60)
+        
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
 
 
-async def test_all_sources():
+async def test_all_sources(content_service):
     """测试所有来源"""
     print("=" * 60)
     print("全源内容抓取测试")
     print("=" * 60)
     
-    async with AsyncSessionLocal() as db:
-        service = ContentAggregatorService(db)
+    service = content_service
+    db = service.db
+    
+    try:
+        print("\n📡 抓取所有来源...")
+        contents = await service.fetch_all_sources()
         
-        try:
-            print("\n📡 抓取所有来源...")
-            contents = await service.fetch_all_sources()
-            
-            print(f"✅ 总共抓取 {len(contents)} 条内容")
-            
-            # 按来源统计
-            from collections import Counter
-            source_counts = Counter(c.source for c in contents)
-            
-            print(f"\n📊 各来源抓取统计:")
-            for source, count in source_counts.items():
-                print(f"   {source}: {count} 条")
-            
-            # 保存到数据库
-            print(f"\n💾 保存到数据库...")
-            saved_count = await service.save_contents_batch(contents)
-            
-            print(f"✅ 成功保存 {saved_count}/{len(contents)} 条内容")
-            
-            return True
-            
-        except Exception as e:
-            print(f"\n❌ 测试失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-            
-        finally:
-            await service.close()
+        print(f"✅ 总共抓取 {len(contents)} 条内容")
+        
+        # 保存到数据库
+        print(f"\n💾 保存到数据库...")
+        saved_count = await service.save_contents_batch(contents)
+        
+        print(f"✅ 成功保存 {saved_count}/{len(contents)} 条内容")
+        
+        # 按来源统计本次抓取的内容（按 URL 限定范围，在数据库侧分组排序）
+        result = await db.execute(
+            SOURCE_COUNTS_BY_URLS_SQL,
+            {"urls": [c.content_url for c in contents]}
+        )
+        
+        print(f"\n📊 各来源入库统计（本次抓取）:")
+        for source, count in result.fetchall():
+            print(f"   {source}: {count} 条")
+        
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
 
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "all":
-        # 测试所有来源
-        success = asyncio.run(test_all_sources())
-    else:
+async def main(all_sources: bool) -> bool:
+    async with open_content_service() as service:
+        if all_sources:
+            # 测试所有来源
+            return await test_all_sources(service)
         # 只测试RSS
-        success = asyncio.run(test_rss_fetch())
+        return await test_rss_fetch(service)
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main(len(sys.argv) > 1 and sys.argv[1] == "all"))
     
     sys.exit(0 if success else 1)
@@ -13,6 +13,8 @@ import asyncio
 from uuid import uuid4
 from datetime import datetime
 
+import pytest
+
 # 模拟Meme对象
 class MockMeme:
     def __init__(self, text_description: str):
@@ -32,113 +34,99 @@ class MockMeme:
         self.usage_count = 0
 
 
-async def test_safety_screener():
-    """测试安全筛选服务"""
+async def make_screener():
+    """创建筛选服务并预热一次（关键词正则编译等惰性初始化不计入用例）"""
     from app.services.safety_screener_service import SafetyScreenerService
     
     screener = SafetyScreenerService()
+    await screener.screen_meme(MockMeme("warmup"))
+    return screener
+
+
+@pytest.fixture(scope="module")
+async def screener():
+    """模块内共享一个已预热的筛选服务"""
+    return await make_screener()
+
+
+# 测试用例：(名称, 文本, 预期状态)
+TEST_CASES = [
+    ("安全内容", "今天天气真好，yyds 永远的神！", "approved"),
+    ("暴力内容", "这个人该杀，血腥暴力", "rejected"),
+    ("色情内容", "约炮一夜情，色情淫秽", "rejected"),
+    ("政治敏感", "六四天安门事件，法轮功", "rejected"),
+    ("歧视内容", "黑鬼尼哥，支那小日本", "rejected"),
+    ("地区冲突", "台独港独，武统台湾", "rejected"),
+    ("版权问题", "迪士尼盗版资源免费下载", "flagged"),  # 不确定，需人工审核
+    ("灾难嘲讽", "汶川地震笑话，新冠笑话", "rejected"),
+    ("弱势群体", "残废瘸子，智障笑话", "rejected"),
+    ("表情符号（安全）", "😂😂😂 笑死我了", "approved"),
+]
+
+
+def print_result(i, name, text, expected, result):
+    """打印单个用例的筛选结果"""
+    status_icon = "✓" if result.overall_status == expected else "✗"
     
-    # 测试用例
-    test_cases = [
-        {
-            "name": "安全内容",
-            "text": "今天天气真好，yyds 永远的神！",
-            "expected": "approved"
-        },
-        {
-            "name": "暴力内容",
-            "text": "这个人该杀，血腥暴力",
-            "expected": "rejected"
-        },
-        {
-            "name": "色情内容",
-            "text": "约炮一夜情，色情淫秽",
-            "expected": "rejected"
-        },
-        {
-            "name": "政治敏感",
-            "text": "六四天安门事件，法轮功",
-            "expected": "rejected"
-        },
-        {
-            "name": "歧视内容",
-            "text": "黑鬼尼哥，支那小日本",
-            "expected": "rejected"
-        },
-        {
-            "name": "地区冲突",
-            "text": "台独港独，武统台湾",
-            "expected": "rejected"
-        },
-        {
-            "name": "版权问题",
-            "text": "迪士尼盗版资源免费下载",
-            "expected": "flagged"  # 不确定，需人工审核
-        },
-        {
-            "name": "灾难嘲讽",
-            "text": "汶川地震笑话，新冠笑话",
-            "expected": "rejected"
-        },
-        {
-            "name": "弱势群体",
-            "text": "残废瘸子，智障笑话",
-            "expected": "rejected"
-        },
-        {
-            "name": "表情符号（安全）",
-            "text": "😂😂😂 笑死我了",
-            "expected": "approved"
-        }
-    ]
+    print(f"\n测试 {i}: {name}")
+    print(f"  文本: {text}")
+    print(f"  预期: {expected}")
+    print(f"  实际: {result.overall_status}")
+    print(f"  结果: {status_icon}")
+    
+    # 显示详细检查结果
+    if result.overall_status != "approved":
+        print(f"  详情:")
+        if result.content_safety.status.value != "passed":
+            print(f"    - 内容安全: {result.content_safety.status.value}")
+            print(f"      原因: {result.content_safety.reason}")
+            print(f"      匹配: {result.content_safety.matched_keywords}")
+        if result.cultural_sensitivity.status.value != "passed":
+            print(f"    - 文化敏感性: {result.cultural_sensitivity.status.value}")
+            print(f"      原因: {result.cultural_sensitivity.reason}")
+            print(f"      匹配: {result.cultural_sensitivity.matched_keywords}")
+        if result.legal_compliance.status.value != "passed":
+            print(f"    - 法律合规: {result.legal_compliance.status.value}")
+            print(f"      原因: {result.legal_compliance.reason}")
+            print(f"      匹配: {result.legal_compliance.matched_keywords}")
+        if result.ethical_boundaries.status.value != "passed":
+            print(f"    - 伦理边界: {result.ethical_boundaries.status.value}")
+            print(f"      原因: {result.ethical_boundaries.reason}")
+            print(f"      匹配: {result.ethical_boundaries.matched_keywords}")
+
+
+@pytest.mark.parametrize(
+    "i,name,text,expected",
+    [(i, *case) for i, case in enumerate(TEST_CASES, 1)],
+    ids=[case[0] for case in TEST_CASES]
+)
+async def test_safety_screener(screener, i, name, text, expected):
+    """测试安全筛选服务（每个用例独立成项，可被 pytest -n 分发）"""
+    result = await screener.screen_meme(MockMeme(text))
+    print_result(i, name, text, expected, result)
+    assert result.overall_status == expected
+
+
+async def main():
+    screener = await make_screener()
     
     print("=" * 80)
     print("SafetyScreenerService 测试")
     print("=" * 80)
     
-    passed = 0
-    failed = 0
+    # 各用例互不依赖，并发筛选后按原顺序输出
+    results = await asyncio.gather(
+        *(screener.screen_meme(MockMeme(text)) for _, text, _ in TEST_CASES)
+    )
     
-    for i, test_case in enumerate(test_cases, 1):
-        meme = MockMeme(test_case["text"])
-        result = await screener.screen_meme(meme)
-        
-        status_match = result.overall_status == test_case["expected"]
-        status_icon = "✓" if status_match else "✗"
-        
-        print(f"\n测试 {i}: {test_case['name']}")
-        print(f"  文本: {test_case['text']}")
-        print(f"  预期: {test_case['expected']}")
-        print(f"  实际: {result.overall_status}")
-        print(f"  结果: {status_icon}")
-        
-        # 显示详细检查结果
-        if result.overall_status != "approved":
-            print(f"  详情:")
-            if result.content_safety.status.value != "passed":
-                print(f"    - 内容安全: {result.content_safety.status.value}")
-                print(f"      原因: {result.content_safety.reason}")
-                print(f"      匹配: {result.content_safety.matched_keywords}")
-            if result.cultural_sensitivity.status.value != "passed":
-                print(f"    - 文化敏感性: {result.cultural_sensitivity.status.value}")
-                print(f"      原因: {result.cultural_sensitivity.reason}")
-                print(f"      匹配: {result.cultural_sensitivity.matched_keywords}")
-            if result.legal_compliance.status.value != "passed":
-                print(f"    - 法律合规: {result.legal_compliance.status.value}")
-                print(f"      原因: {result.legal_compliance.reason}")
-                print(f"      匹配: {result.legal_compliance.matched_keywords}")
-            if result.ethical_boundaries.status.value != "passed":
-                print(f"    - 伦理边界: {result.ethical_boundaries.status.value}")
-                print(f"      原因: {result.ethical_boundaries.reason}")
-                print(f"      匹配: {result.ethical_boundaries.matched_keywords}")
-        
-        if status_match:
-            passed += 1
-        else:
-            failed += 1
+    passed = 0
+    for i, ((name, text, expected), result) in enumerate(zip(TEST_CASES, results), 1):
+        print_result(i, name, text, expected, result)
+        passed += result.overall_status == expected
+    failed = len(TEST_CASES) - passed
     
     print("\n" + "=" * 80)
-    print(f"测试结果: {passed}/{len(test_cases)} 通过")
+    print(f"测试结果: {passed}/{len(TEST_CASES)} 通过")
     if failed > 0:
         print(f"失败: {failed} 个测试")
     else:
@@ -147,4 +135,4 @@ async def test_safety_screener():
 
 
 if __name__ == "__main__":
-    asyncio.run(test_safety_screener())
+    asyncio.run(main())
@@ -12,6 +12,19 @@ NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "neo4j_secret"
 USER_ID = "9a9e9803-94d6-4ecd-8d09-66fb4745ef85"
 
+# 查询所有 LIVES_IN 关系
+LIVES_IN_CYPHER = """
+    MATCH (p)-[r:LIVES_IN]->(place)
+    WHERE p.user_id = $user_id
+    RETURN p.name AS person, place.name AS location, r.weight AS weight
+"""
+
+# 查询昊哥的所有关系
+HAOGE_RELATIONS_CYPHER = """
+    MATCH (p {name: '昊哥', user_id: $user_id})-[r]->(target)
+    RETURN p.name AS source, type(r) AS rel, target.name AS target
+"""
+
 
 async def test_semantic_retrieval():
     """测试语义扩展检索"""
@@ -80,27 +93,19 @@ async def test_direct_neo4j_query():
     )
     
     try:
-        async with neo4j_driver.session() as session:
-            # 查询所有 LIVES_IN 关系
-            result = await session.run("""
-                MATCH (p)-[r:LIVES_IN]->(place)
-                WHERE p.user_id = $user_id
-                RETURN p.name AS person, place.name AS location, r.weight AS weight
-            """, user_id=USER_ID)
-            
-            print("\n所有 LIVES_IN 关系:")
-            async for record in result:
-                print(f"  {record['person']} 住在 {record['location']} (weight: {record['weight']})")
-            
-            # 查询昊哥的所有关系
-            result2 = await session.run("""
-                MATCH (p {name: '昊哥', user_id: $user_id})-[r]->(target)
-                RETURN p.name AS source, type(r) AS rel, target.name AS target
-            """, user_id=USER_ID)
-            
-            print("\n昊哥的所有关系:")
-            async for record in result2:
-                print(f"  {record['source']} -[{record['rel']}]-> {record['target']}")
+        # 两条查询互不依赖：并发执行，各自从连接池取会话（execute_query 自动管理）
+        (lives_in, _, _), (relations, _, _) = await asyncio.gather(
+            neo4j_driver.execute_query(LIVES_IN_CYPHER, user_id=USER_ID),
+            neo4j_driver.execute_query(HAOGE_RELATIONS_CYPHER, user_id=USER_ID),
+        )
+        
+        print("\n所有 LIVES_IN 关系:")
+        for record in lives_in:
+            print(f"  {record['person']} 住在 {record['location']} (weight: {record['weight']})")
+        
+        print("\n昊哥的所有关系:")
+        for record in relations:
+            print(f"  {record['source']} -[{record['rel']}]-> {record['target']}")
                 
     finally:
         await neo4j_driver.close()
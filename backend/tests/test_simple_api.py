@@ -1,25 +1,50 @@
 """Simple API test"""
-import requests
+import asyncio
 
-# Get token
-auth_resp = requests.post('http://localhost:8000/api/v1/auth/token', json={})
-print(f"Auth status: {auth_resp.status_code}")
+import httpx
 
-token_data = auth_resp.json()
-token = token_data['access_token']
-user_id = token_data['user_id']
+BASE_URL = "http://localhost:8000"
+API_BASE = f"{BASE_URL}/api/v1"
 
-print(f"User ID: {user_id}")
+# Issued tokens per user_id for this process (None = new anonymous user)
+_token_cache: dict = {}
 
-# Get recommendations
-headers = {'Authorization': f'Bearer {token}'}
-rec_resp = requests.get('http://localhost:8000/api/v1/content/recommendations', headers=headers)
 
-print(f"\nRecommendations status: {rec_resp.status_code}")
-print(f"Response: {rec_resp.text[:500]}")
+async def fetch_token(client: httpx.AsyncClient, user_id=None) -> dict:
+    """Issue a token once per user_id and reuse it afterwards"""
+    if user_id not in _token_cache:
+        payload = {"user_id": user_id} if user_id else {}
+        auth_resp = await client.post(f"{API_BASE}/auth/token", json=payload)
+        print(f"Auth status: {auth_resp.status_code}")
+        _token_cache[user_id] = auth_resp.json()
+    return _token_cache[user_id]
 
-if rec_resp.status_code == 200:
-    recs = rec_resp.json()
-    print(f"\nCount: {len(recs)}")
-    for rec in recs:
-        print(f"  - {rec['title']}")
+
+async def main():
+    async with httpx.AsyncClient() as client:
+        # Get token (health check goes out on the same client in parallel)
+        token_data, _ = await asyncio.gather(
+            fetch_token(client),
+            client.get(f"{BASE_URL}/health")
+        )
+        token = token_data['access_token']
+        user_id = token_data['user_id']
+
+        print(f"User ID: {user_id}")
+
+        # Get recommendations (needs the token, so it is chained after auth)
+        headers = {'Authorization': f'Bearer {token}'}
+        rec_resp = await client.get(f"{API_BASE}/content/recommendations", headers=headers)
+
+    print(f"\nRecommendations status: {rec_resp.status_code}")
+    print(f"Response: {rec_resp.text[:500]}")
+
+    if rec_resp.status_code == 200:
+        recs = rec_resp.json()
+        print(f"\nCount: {len(recs)}")
+        for rec in recs:
+            print(f"  - {rec['title']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
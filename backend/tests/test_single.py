@@ -6,16 +6,25 @@ import time
 API_BASE = "http://localhost:8000/api/v1"
 USER_ID = "9a9e9803-94d6-4ecd-8d09-66fb4745ef85"
 
+# 共享会话（HTTP keep-alive）与 token 缓存：整个脚本只签发一次 token
+_SESSION = requests.Session()
+_TOKEN = None
+
 def get_token():
-    r = requests.post(f"{API_BASE}/auth/token", json={"user_id": USER_ID})
-    return r.json()["access_token"]
+    global _TOKEN
+    if _TOKEN is None:
+        r = _SESSION.post(f"{API_BASE}/auth/token", json={"user_id": USER_ID})
+        _TOKEN = r.json()["access_token"]
+    return _TOKEN
+
+def auth_headers():
+    return {"Authorization": f"Bearer {get_token()}"}
 
 def send_message(text):
-    token = get_token()
-    resp = requests.post(
+    resp = _SESSION.post(
         f"{API_BASE}/sse/message",
         json={"message": text},
-        headers={"Authorization": f"Bearer {token}"},
+        headers=auth_headers(),
         stream=True
     )
     
@@ -36,13 +45,13 @@ def send_message(text):
     return memory_id
 
 def wait_commit(memory_id, timeout=60):
-    token = get_token()
+    headers = auth_headers()
     start = time.time()
     while time.time() - start < timeout:
         try:
-            resp = requests.get(
+            resp = _SESSION.get(
                 f"{API_BASE}/memories/{memory_id}",
-                headers={"Authorization": f"Bearer {token}"}
+                headers=headers
             )
             if resp.status_code == 200:
                 if resp.json().get("status") == "committed":
@@ -53,8 +62,7 @@ def wait_commit(memory_id, timeout=60):
     return False
 
 def get_graph():
-    token = get_token()
-    resp = requests.get(f"{API_BASE}/graph/", headers={"Authorization": f"Bearer {token}"})
+    resp = _SESSION.get(f"{API_BASE}/graph/", headers=auth_headers())
     return resp.json()
 
 # 测试